@@ -0,0 +1,283 @@
+"""
+School Database Benchmark
+
+Generates students/grades at a configurable scale, then runs every query
+from data.sql with and without the performance indexes and prints a JSON
+report with timings and EXPLAIN QUERY PLAN output.
+
+Usage:
+    python benchmark.py --students 100000 --grades 10000000 -o report.json
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_SQL_PATH = os.path.join(BASE_DIR, "data.sql")
+GRADE_STATS_SQL_PATH = os.path.join(BASE_DIR, "grade_stats.sql")
+
+FIRST_NAMES = [
+    "Alice", "Brian", "Carla", "Daniel", "Eva", "Felix", "Grace", "Henry",
+    "Isabella", "Jack", "Kira", "Liam", "Maya", "Noah", "Olivia", "Pavel",
+    "Quinn", "Rosa", "Samuel", "Tina", "Umar", "Vera", "Wes", "Yara", "Zoe",
+]
+LAST_NAMES = [
+    "Johnson", "Smith", "Reyes", "Kim", "Thompson", "Nguyen", "Patel",
+    "Lopez", "Martinez", "Brown", "Garcia", "Ivanova", "Kowalski", "Muller",
+    "Novak", "Okafor", "Rossi", "Sato", "Silva", "Walker",
+]
+# Subject -> mean grade, so per-subject averages differ like in real data
+SUBJECTS = {
+    "Math": 78, "English": 84, "Science": 80, "History": 82, "Art": 88,
+    "Physical Education": 90, "Biology": 81, "Chemistry": 76, "Physics": 74,
+    "Geography": 83, "Music": 87, "Literature": 85,
+}
+NULL_GRADE_RATE = 0.01
+CHUNK_SIZE = 100_000
+
+Report = Dict[str, object]
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Split an SQL script into complete statements (triggers stay whole)
+    """
+    statements = []
+    buffer = ""
+    for line in sql.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statement = strip_comments(buffer)
+            if statement:
+                statements.append(statement)
+            buffer = ""
+
+    return statements
+
+
+def strip_comments(statement: str) -> str:
+    """
+    Remove leading -- and /* */ comments from a statement
+    """
+    statement = re.sub(r"/\*.*?\*/", "", statement, flags=re.S)
+    lines = [line for line in statement.splitlines()
+             if not line.strip().startswith("--")]
+
+    return "\n".join(lines).strip()
+
+
+def parse_data_sql(sql: str) -> Dict[str, List]:
+    """
+    Sort the statements of data.sql into schema, queries and indexes
+    """
+    parsed: Dict[str, List] = {"tables": [], "triggers": [],
+                               "queries": [], "indexes": []}
+    title: Optional[str] = None
+    for statement in split_statements(sql):
+        upper = statement.upper()
+        banner = re.match(r"SELECT\s+'=== (Query \d+): (.*?) ===';?$",
+                          statement)
+        if upper.startswith("CREATE TABLE"):
+            parsed["tables"].append(statement)
+        elif upper.startswith("CREATE TRIGGER"):
+            parsed["triggers"].append(statement)
+        elif upper.startswith("CREATE INDEX"):
+            name = re.search(r"EXISTS\s+(\w+)", statement).group(1)
+            parsed["indexes"].append((name, statement))
+        elif banner:
+            title = f"{banner.group(1)}: {banner.group(2)}"
+        elif upper.startswith("SELECT") and title:
+            parsed["queries"].append((title, statement))
+            title = None
+
+    return parsed
+
+
+def generate_students(count: int, rng: random.Random) -> Iterator[Tuple[str, int]]:
+    """
+    Yield (full_name, birth_year) rows
+    """
+    for _ in range(count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        yield name, rng.randint(2000, 2008)
+
+
+def generate_grades(count: int, students: int,
+                    rng: random.Random) -> Iterator[Tuple[int, str, Optional[int]]]:
+    """
+    Yield (student_id, subject, grade) rows; each student has a fixed
+    ability offset so per-student averages are spread out
+    """
+    abilities = [rng.gauss(0, 8) for _ in range(students)]
+    subjects = list(SUBJECTS.items())
+    for _ in range(count):
+        student_id = rng.randint(1, students)
+        subject, mean = rng.choice(subjects)
+        if rng.random() < NULL_GRADE_RATE:
+            grade = None
+        else:
+            value = rng.gauss(mean + abilities[student_id - 1], 10)
+            grade = min(100, max(1, round(value)))
+        yield student_id, subject, grade
+
+
+def load_data(conn: sqlite3.Connection, parsed: Dict[str, List],
+              students: int, grades: int, seed: int) -> Report:
+    """
+    Create the schema and bulk load generated rows.
+
+    Everything is inserted in one transaction with executemany; triggers
+    and indexes are created afterwards and the summary tables are rebuilt
+    once from grades.
+    """
+    rng = random.Random(seed)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    for statement in parsed["tables"]:
+        conn.execute(statement)
+
+    start = time.perf_counter()
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO students (full_name, birth_year) VALUES (?, ?)",
+        generate_students(students, rng))
+    rows = generate_grades(grades, students, rng)
+    loaded = 0
+    while loaded < grades:
+        chunk = [next(rows) for _ in range(min(CHUNK_SIZE, grades - loaded))]
+        conn.executemany(
+            "INSERT INTO grades (student_id, subject, grade) VALUES (?, ?, ?)",
+            chunk)
+        loaded += len(chunk)
+        print(f"Loaded {loaded}/{grades} grades", file=sys.stderr)
+    conn.execute("COMMIT")
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open(GRADE_STATS_SQL_PATH, encoding="utf-8") as file:
+        rebuild = [statement for statement in split_statements(file.read())
+                   if not statement.upper().startswith("SELECT")]
+    for statement in rebuild:
+        conn.execute(statement)
+    for statement in parsed["triggers"]:
+        conn.execute(statement)
+    stats_seconds = time.perf_counter() - start
+
+    return {
+        "students": students,
+        "grades": grades,
+        "seed": seed,
+        "load_seconds": round(load_seconds, 3),
+        "grades_per_second": round(grades / load_seconds) if load_seconds else None,
+        "stats_rebuild_seconds": round(stats_seconds, 3),
+    }
+
+
+def run_query(conn: sqlite3.Connection, sql: str, repeat: int) -> Report:
+    """
+    Time a query (best of `repeat` runs) and capture its query plan
+    """
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = sum(1 for _ in conn.execute(sql))
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "best_seconds": round(min(timings), 6),
+        "mean_seconds": round(sum(timings) / len(timings), 6),
+        "rows": rows,
+        "plan": plan,
+    }
+
+
+def run_benchmark(students: int, grades: int, seed: int, repeat: int,
+                  db_path: str) -> Report:
+    """
+    Generate the database at db_path and benchmark every data.sql query
+    """
+    with open(DATA_SQL_PATH, encoding="utf-8") as file:
+        parsed = parse_data_sql(file.read())
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        load = load_data(conn, parsed, students, grades, seed)
+
+        results: List[Dict[str, Union[str, Report]]] = [
+            {"query": title, "sql": sql,
+             "without_indexes": run_query(conn, sql, repeat)}
+            for title, sql in parsed["queries"]
+        ]
+
+        index_seconds = {}
+        for name, statement in parsed["indexes"]:
+            start = time.perf_counter()
+            conn.execute(statement)
+            index_seconds[name] = round(time.perf_counter() - start, 3)
+        conn.execute("ANALYZE")
+
+        for result, (_, sql) in zip(results, parsed["queries"]):
+            result["with_indexes"] = run_query(conn, sql, repeat)
+    finally:
+        conn.close()
+
+    return {
+        "sqlite_version": sqlite3.sqlite_version,
+        "load": load,
+        "index_build_seconds": index_seconds,
+        "queries": results,
+    }
+
+
+def main() -> None:
+    """
+    Parse arguments, run the benchmark and write the JSON report
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark data.sql queries on generated data")
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--grades", type=int, default=1_000_000,
+                        help="number of grades to generate (up to 100M)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per query, the best one is reported")
+    parser.add_argument("--db", help="keep the generated database here "
+                        "(default: temporary file, removed afterwards)")
+    parser.add_argument("-o", "--output",
+                        help="report file (default: stdout)")
+    args = parser.parse_args()
+
+    if args.students < 1 or args.grades < 0 or args.repeat < 1:
+        parser.error("--students and --repeat must be positive, "
+                     "--grades must not be negative")
+
+    if args.db:
+        if os.path.exists(args.db):
+            parser.error(f"{args.db} already exists")
+        report = run_benchmark(args.students, args.grades, args.seed,
+                               args.repeat, args.db)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report = run_benchmark(args.students, args.grades, args.seed,
+                                   args.repeat, os.path.join(tmp_dir, "school.db"))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
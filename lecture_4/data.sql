@@ -22,6 +22,105 @@ CREATE TABLE IF NOT EXISTS grades (
     FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
 );
 
+-- Table: student_grade_stats - running sum/count of grades per student
+-- row_count counts grade rows, grade_count only the non-NULL grades (like AVG)
+CREATE TABLE IF NOT EXISTS student_grade_stats (
+    student_id INTEGER PRIMARY KEY,
+    grade_sum INTEGER NOT NULL DEFAULT 0,
+    grade_count INTEGER NOT NULL DEFAULT 0,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    average_grade REAL GENERATED ALWAYS AS
+        (CAST(grade_sum AS REAL) / NULLIF(grade_count, 0)) VIRTUAL
+);
+
+-- Table: subject_grade_stats - running sum/count of grades per subject
+-- Grades with a NULL subject are not tracked here
+CREATE TABLE IF NOT EXISTS subject_grade_stats (
+    subject TEXT PRIMARY KEY NOT NULL,
+    grade_sum INTEGER NOT NULL DEFAULT 0,
+    grade_count INTEGER NOT NULL DEFAULT 0,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    average_grade REAL GENERATED ALWAYS AS
+        (CAST(grade_sum AS REAL) / NULLIF(grade_count, 0)) VIRTUAL
+);
+
+-- Triggers: keep the summary tables current on every change to grades
+CREATE TRIGGER IF NOT EXISTS trg_grades_stats_insert
+AFTER INSERT ON grades
+BEGIN
+    INSERT INTO student_grade_stats (student_id, grade_sum, grade_count, row_count)
+    VALUES (NEW.student_id, COALESCE(NEW.grade, 0), NEW.grade IS NOT NULL, 1)
+    ON CONFLICT (student_id) DO UPDATE SET
+        grade_sum = grade_sum + excluded.grade_sum,
+        grade_count = grade_count + excluded.grade_count,
+        row_count = row_count + 1;
+
+    INSERT INTO subject_grade_stats (subject, grade_sum, grade_count, row_count)
+    SELECT NEW.subject, COALESCE(NEW.grade, 0), NEW.grade IS NOT NULL, 1
+    WHERE NEW.subject IS NOT NULL
+    ON CONFLICT (subject) DO UPDATE SET
+        grade_sum = grade_sum + excluded.grade_sum,
+        grade_count = grade_count + excluded.grade_count,
+        row_count = row_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_grades_stats_delete
+AFTER DELETE ON grades
+BEGIN
+    UPDATE student_grade_stats SET
+        grade_sum = grade_sum - COALESCE(OLD.grade, 0),
+        grade_count = grade_count - (OLD.grade IS NOT NULL),
+        row_count = row_count - 1
+    WHERE student_id = OLD.student_id;
+    DELETE FROM student_grade_stats
+    WHERE student_id = OLD.student_id AND row_count = 0;
+
+    UPDATE subject_grade_stats SET
+        grade_sum = grade_sum - COALESCE(OLD.grade, 0),
+        grade_count = grade_count - (OLD.grade IS NOT NULL),
+        row_count = row_count - 1
+    WHERE subject = OLD.subject;
+    DELETE FROM subject_grade_stats
+    WHERE subject = OLD.subject AND row_count = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_grades_stats_update
+AFTER UPDATE OF student_id, subject, grade ON grades
+BEGIN
+    -- Remove the old row from the totals...
+    UPDATE student_grade_stats SET
+        grade_sum = grade_sum - COALESCE(OLD.grade, 0),
+        grade_count = grade_count - (OLD.grade IS NOT NULL),
+        row_count = row_count - 1
+    WHERE student_id = OLD.student_id;
+    DELETE FROM student_grade_stats
+    WHERE student_id = OLD.student_id AND row_count = 0;
+
+    UPDATE subject_grade_stats SET
+        grade_sum = grade_sum - COALESCE(OLD.grade, 0),
+        grade_count = grade_count - (OLD.grade IS NOT NULL),
+        row_count = row_count - 1
+    WHERE subject = OLD.subject;
+    DELETE FROM subject_grade_stats
+    WHERE subject = OLD.subject AND row_count = 0;
+
+    -- ...and add the new one
+    INSERT INTO student_grade_stats (student_id, grade_sum, grade_count, row_count)
+    VALUES (NEW.student_id, COALESCE(NEW.grade, 0), NEW.grade IS NOT NULL, 1)
+    ON CONFLICT (student_id) DO UPDATE SET
+        grade_sum = grade_sum + excluded.grade_sum,
+        grade_count = grade_count + excluded.grade_count,
+        row_count = row_count + 1;
+
+    INSERT INTO subject_grade_stats (subject, grade_sum, grade_count, row_count)
+    SELECT NEW.subject, COALESCE(NEW.grade, 0), NEW.grade IS NOT NULL, 1
+    WHERE NEW.subject IS NOT NULL
+    ON CONFLICT (subject) DO UPDATE SET
+        grade_sum = grade_sum + excluded.grade_sum,
+        grade_count = grade_count + excluded.grade_count,
+        row_count = row_count + 1;
+END;
+
 -- 2. INSERT SAMPLE DATA
 -- --------------------
 -- Insert 9 sample students
@@ -77,11 +176,11 @@ WHERE s.full_name = 'Alice Johnson';
 
 -- Query 4: Average grade per student
 SELECT '=== Query 4: Average grade per student ===';
-SELECT s.full_name, AVG(g.grade) as average_grade
-FROM students s
-JOIN grades g ON s.id = g.student_id
-GROUP BY s.id, s.full_name
-ORDER BY average_grade DESC;
+-- Reads the precomputed totals instead of aggregating every grade
+SELECT s.full_name, st.average_grade
+FROM student_grade_stats st
+JOIN students s ON s.id = st.student_id
+ORDER BY st.average_grade DESC;
 
 -- Query 5: Students born after 2004
 SELECT '=== Query 5: Students born after 2004 ===';
@@ -92,18 +191,17 @@ ORDER BY birth_year;
 
 -- Query 6: Subjects and their average grades
 SELECT '=== Query 6: Subjects and average grades ===';
-SELECT subject, AVG(grade) as average_grade
-FROM grades
-GROUP BY subject
+SELECT subject, average_grade
+FROM subject_grade_stats
 ORDER BY average_grade DESC;
 
 -- Query 7: Top 3 students by average grade
 SELECT '=== Query 7: Top 3 students ===';
-SELECT s.full_name, AVG(g.grade) as average_grade
-FROM students s
-JOIN grades g ON s.id = g.student_id
-GROUP BY s.id, s.full_name
-ORDER BY average_grade DESC
+-- Walks idx_student_grade_stats_average, so only 3 rows are read
+SELECT s.full_name, st.average_grade
+FROM student_grade_stats st
+JOIN students s ON s.id = st.student_id
+ORDER BY st.average_grade DESC
 LIMIT 3;
 
 -- Query 8: Students with any grade below 80
@@ -118,8 +216,14 @@ ORDER BY g.grade;
 -- ---------------------------
 -- Create indexes to optimize frequent queries
 CREATE INDEX IF NOT EXISTS idx_students_birth_year ON students(birth_year);
-CREATE INDEX IF NOT EXISTS idx_grades_student_id ON grades(student_id);
+-- Covering index: student lookups and grade filters never touch the table
+-- (also replaces the single-column idx_grades_student_id)
+CREATE INDEX IF NOT EXISTS idx_grades_student_grade ON grades(student_id, grade);
 CREATE INDEX IF NOT EXISTS idx_grades_subject ON grades(subject);
 CREATE INDEX IF NOT EXISTS idx_grades_grade ON grades(grade);
+CREATE INDEX IF NOT EXISTS idx_student_grade_stats_average
+    ON student_grade_stats(average_grade);
+CREATE INDEX IF NOT EXISTS idx_subject_grade_stats_average
+    ON subject_grade_stats(average_grade);
 
 SELECT '=== Database setup complete ===';
\ No newline at end of file
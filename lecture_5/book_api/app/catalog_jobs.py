@@ -0,0 +1,255 @@
+"""
+Background jobs over the whole book catalog.
+
+Every job reads books in chunks of CHUNK_SIZE rows by id, one short
+transaction per chunk and shard, so no job holds the SQLite lock for
+long and foreground requests run between chunks.
+"""
+
+import json
+import os
+import string
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .coalescing import SingleFlight
+from .jobs import Handler, JobContext
+from .locks import StripedLock
+from .suggest import PrefixIndex
+from database.sharding import ShardRouter
+
+CHUNK_SIZE = 500
+
+# Ids returned in the dedup result; the full list is written to a file so
+# the job row (and every poll of it) stays small
+SAMPLE_SIZE = 20
+
+# SQLite lower() (used by ilike) only folds ASCII letters
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def count_books(router: ShardRouter) -> int:
+    """Return the number of books on all shards."""
+    def count(shard: int) -> int:
+        with router.session_factories[shard]() as session:
+            return session.query(func.count(models.Book.id)).scalar()
+
+    return sum(router.map(count))
+
+
+def dedup_key(title: str, author: str) -> Tuple[str, str]:
+    """Return the (title, author) key books are compared by in dedup."""
+    return title.translate(ASCII_LOWER), author.translate(ASCII_LOWER)
+
+
+def read_books(session: Session,
+               ids: List[int]) -> Dict[int, Tuple[str, str]]:
+    """Return id -> (title, author) of the given books that still exist."""
+    rows = session.query(models.Book.id, models.Book.title,
+                         models.Book.author).filter(
+        models.Book.id.in_(ids)).all()
+    return {book_id: (title, author) for book_id, title, author in rows}
+
+
+def iter_chunks(router: ShardRouter,
+                *columns: Any) -> Iterator[Tuple[int, List[Any]]]:
+    """
+    Yield (shard, rows) with the given columns of every book,
+    CHUNK_SIZE rows at a time.
+
+    The first column must be models.Book.id, it is used to page through
+    each shard.
+    """
+    for shard in range(router.count):
+        last_id = 0
+        while True:
+            with router.session_factories[shard]() as session:
+                rows = session.query(*columns).filter(
+                    models.Book.id > last_id
+                ).order_by(models.Book.id).limit(CHUNK_SIZE).all()
+            if not rows:
+                break
+            yield shard, rows
+            last_id = rows[-1][0]
+
+
+def build_handlers(router: ShardRouter, suggest_index: PrefixIndex,
+                   book_locks: StripedLock, read_flights: SingleFlight,
+                   export_dir: str) -> Dict[str, Handler]:
+    """
+    Return the catalog job handlers bound to the app's shared objects.
+    """
+
+    def reindex(context: JobContext) -> Dict[str, int]:
+        """
+        Rebuild the autocomplete index from the database.
+
+        Books written while the job runs may be missed; run it again
+        after bulk changes made outside the API.
+        """
+        context.set_total(count_books(router))
+        rows = []
+        for _, chunk in iter_chunks(router, models.Book.id,
+                                    models.Book.title, models.Book.author):
+            rows.extend((title, author) for _, title, author in chunk)
+            context.advance(len(chunk))
+
+        suggest_index.build(rows)
+        return {"books": len(rows)}
+
+    def dedup(context: JobContext) -> Dict[str, Any]:
+        """
+        Find books with the same title and author (compared like ilike:
+        ignoring ASCII case) and delete all but the oldest one. Books
+        edited or deleted after the scan are checked again before each
+        delete, so only rows that are still duplicates are removed.
+
+        The ids of all duplicates found are written one per line to
+        export_dir/duplicates-<job id>.txt; the result only holds the
+        first SAMPLE_SIZE of them.
+
+        Params:
+        - dry_run: Only report the duplicates (default True)
+        """
+        dry_run = bool(context.params.get("dry_run", True))
+        context.set_total(count_books(router))
+
+        # (title, author) -> [(id, shard), ...]
+        books_by_key: Dict[Any, List[Tuple[int, int]]] = {}
+        for shard, chunk in iter_chunks(router, models.Book.id,
+                                        models.Book.title, models.Book.author):
+            for book_id, title, author in chunk:
+                books_by_key.setdefault(dedup_key(title, author), []).append(
+                    (book_id, shard))
+            context.advance(len(chunk))
+
+        # Duplicate id -> (key, id and shard of the book kept instead)
+        kept_for: Dict[int, Tuple[Any, int, int]] = {}
+        by_shard: Dict[int, List[int]] = {}
+        for key, books in books_by_key.items():
+            (kept_id, kept_shard), *others = sorted(books)
+            for book_id, shard in others:
+                kept_for[book_id] = (key, kept_id, kept_shard)
+                by_shard.setdefault(shard, []).append(book_id)
+        duplicates = sorted(kept_for)
+
+        os.makedirs(export_dir, exist_ok=True)
+        path = os.path.join(export_dir, f"duplicates-{context.job_id}.txt")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.writelines(f"{book_id}\n" for book_id in duplicates)
+        os.replace(temp_path, path)
+
+        summary = {"duplicates": len(duplicates), "ids_path": path,
+                   "sample_ids": duplicates[:SAMPLE_SIZE]}
+        if dry_run:
+            return {"dry_run": True, **summary}
+
+        deleted = 0
+        for shard, ids in by_shard.items():
+            for start in range(0, len(ids), CHUNK_SIZE):
+                chunk = ids[start:start + CHUNK_SIZE]
+
+                # Books may have been edited or deleted since the scan:
+                # re-read the kept books and the candidates, and only
+                # delete candidates that still match a kept book
+                kept_ids: Dict[int, List[int]] = {}
+                for book_id in chunk:
+                    _, kept_id, kept_shard = kept_for[book_id]
+                    kept_ids.setdefault(kept_shard, []).append(kept_id)
+                kept_keys: Dict[int, Tuple[str, str]] = {}
+                for kept_shard, shard_ids in kept_ids.items():
+                    with router.session_factories[kept_shard]() as session:
+                        kept_keys.update(
+                            (book_id, dedup_key(title, author))
+                            for book_id, (title, author)
+                            in read_books(session, shard_ids).items())
+
+                # Hold the candidates' locks like the write endpoints, so
+                # the index is updated in the same order as the rows
+                with book_locks.hold(*chunk):
+                    with router.session_factories[shard]() as session:
+                        books = read_books(session, chunk)
+                        confirmed = [
+                            book_id
+                            for book_id, (title, author) in books.items()
+                            if dedup_key(title, author) == kept_for[book_id][0]
+                            and kept_keys.get(kept_for[book_id][1])
+                            == kept_for[book_id][0]
+                        ]
+                        if confirmed:
+                            session.query(models.Book).filter(
+                                models.Book.id.in_(confirmed)
+                            ).delete(synchronize_session=False)
+                            session.commit()
+
+                    for book_id in confirmed:
+                        suggest_index.remove(*books[book_id])
+                read_flights.forget_all()
+                deleted += len(confirmed)
+                context.check_cancelled()
+
+        return {"dry_run": False, "deleted": deleted, **summary}
+
+    def export(context: JobContext) -> Dict[str, Any]:
+        """
+        Write every book as a JSON line to export_dir/books-<job id>.jsonl.
+        """
+        context.set_total(count_books(router))
+        os.makedirs(export_dir, exist_ok=True)
+        path = os.path.join(export_dir, f"books-{context.job_id}.jsonl")
+        temp_path = f"{path}.tmp"
+
+        exported = 0
+        try:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                for _, chunk in iter_chunks(router, models.Book.id,
+                                            models.Book):
+                    for _, book in chunk:
+                        file.write(json.dumps(book.to_dict(),
+                                              ensure_ascii=False) + "\n")
+                    exported += len(chunk)
+                    context.advance(len(chunk))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        os.replace(temp_path, path)
+        return {"path": path, "books": exported}
+
+    def stats(context: JobContext) -> Dict[str, Any]:
+        """
+        Count books per publication year and per author.
+        """
+        context.set_total(count_books(router))
+        by_year: Counter = Counter()
+        by_author: Counter = Counter()
+        books = 0
+        for _, chunk in iter_chunks(router, models.Book.id,
+                                    models.Book.author, models.Book.year):
+            for _, author, year in chunk:
+                by_year[year] += 1
+                by_author[author] += 1
+            books += len(chunk)
+            context.advance(len(chunk))
+
+        return {
+            "books": books,
+            "authors": len(by_author),
+            "by_year": {str(year): count for year, count
+                        in sorted(by_year.items(),
+                                  key=lambda item: (item[0] is None,
+                                                    item[0] or 0))},
+            "top_authors": by_author.most_common(10),
+        }
+
+    return {
+        "reindex": reindex,
+        "dedup": dedup,
+        "export": export,
+        "stats": stats,
+    }
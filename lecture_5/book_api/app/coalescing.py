@@ -0,0 +1,122 @@
+"""
+Single-flight coalescing of identical concurrent reads.
+
+The first request for a key runs the query; requests with the same key
+that arrive while it is in flight wait for it and get the same result
+(or the same exception) instead of running the query again.
+"""
+
+import threading
+from typing import Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    """An in-flight execution shared by every request with its key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+def copy_error(error: BaseException) -> BaseException:
+    """
+    Return a copy of error for one waiter to raise.
+
+    Raising the leader's exception object from every waiter thread would
+    add each thread's frames to its shared __traceback__; the copy starts
+    without a traceback or chained exceptions. copy.copy() is not enough:
+    it calls __init__ again, which fails for e.g. HTTPException.
+    """
+    cls = type(error)
+    try:
+        clone = cls.__new__(cls, *error.args)
+    except TypeError:
+        clone = cls.__new__(cls)
+    clone.args = error.args
+    clone.__dict__.update(error.__dict__)
+    return clone
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls by key.
+
+    Endpoints run in the threadpool, so waiters block on a
+    threading.Event rather than an asyncio future.
+
+    Attributes:
+    - enabled: When False every call runs on its own (for benchmarks)
+    - executions: Number of calls that actually ran
+    - coalesced: Number of calls answered by another call's result
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.executions = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        Return fn(), sharing one execution between concurrent callers.
+        """
+        with self._lock:
+            call = self._calls.get(key) if self.enabled else None
+            if call is None:
+                leader = True
+                call = _Call()
+                self.executions += 1
+                if self.enabled:
+                    self._calls[key] = call
+            else:
+                leader = False
+                self.coalesced += 1
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            with self._lock:
+                error = call.error
+                # No waiter joins once done is set: the last one drops the
+                # leader's exception (and the frames its traceback holds)
+                call.waiters -= 1
+                if call.waiters == 0:
+                    call.error = None
+            if error is not None:
+                # The copy's traceback will hold this frame, so it must not
+                # keep a reference to the leader's exception
+                clone = copy_error(error)
+                del error
+                raise clone from None
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                # Only keep the exception for waiters that will read it
+                if call.waiters == 0:
+                    call.error = None
+            call.done.set()
+
+        return call.result
+
+    def forget_all(self) -> None:
+        """
+        Stop handing in-flight results to new callers.
+
+        Called after writes: a query that started before the commit may
+        not see it, so later reads must run their own query.
+        """
+        with self._lock:
+            self._calls.clear()
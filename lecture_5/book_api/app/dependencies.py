@@ -1,3 +1,3 @@
 """There should be dependencies. They can be created in future"""
 
-from database.engine import get_db
+from database.engine import get_db, get_shards
@@ -0,0 +1,225 @@
+"""
+In-process background job runner.
+
+Jobs run on a small thread pool and their state (status, progress,
+result) is stored in the jobs table, so it can be polled through the API
+and survives the worker. Handlers process books in chunks and report
+progress after each one, which is also where cancellation is checked.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import sessionmaker
+
+from . import models
+
+# Pause after every chunk so foreground requests get the GIL and the
+# SQLite write lock between chunks
+CHUNK_PAUSE = 0.005
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled."""
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already queued or running."""
+
+
+class JobContext:
+    """
+    Handle given to a job handler.
+
+    Attributes:
+    - job_id: Id of the running job
+    - params: Parameters the job was started with
+    """
+
+    def __init__(self, runner: "JobRunner", job_id: int,
+                 params: Dict[str, Any], cancel_event: threading.Event):
+        self.job_id = job_id
+        self.params = params
+        self._runner = runner
+        self._cancel_event = cancel_event
+        self._processed = 0
+
+    def set_total(self, total: int) -> None:
+        """Record how many books the job is going to process."""
+        self._runner._update(self.job_id, total=total)
+
+    def advance(self, count: int) -> None:
+        """
+        Record a finished chunk, yield to foreground work and stop the
+        job if it has been cancelled.
+        """
+        self._processed += count
+        self._runner._update(self.job_id, processed=self._processed)
+        time.sleep(CHUNK_PAUSE)
+        self.check_cancelled()
+
+    def check_cancelled(self) -> None:
+        """Raise JobCancelled if the job has been cancelled."""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+
+Handler = Callable[[JobContext], Any]
+
+
+class JobRunner:
+    """
+    Run jobs from the jobs table on a bounded worker pool.
+
+    Parameters:
+    - session_factory: Sessions on the database holding the jobs table
+    - handlers: Job kind -> function doing the work, returning the result
+    - max_workers: Jobs running at the same time
+    - max_pending: Jobs allowed to be queued or running at once
+    """
+
+    def __init__(self, session_factory: sessionmaker,
+                 handlers: Dict[str, Handler], max_workers: int = 2,
+                 max_pending: int = 16):
+        self.session_factory = session_factory
+        self.handlers = handlers
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._cancel_events: Dict[int, threading.Event] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self) -> None:
+        """
+        Start the worker pool.
+
+        Jobs left queued or running by a previous process can not be
+        resumed, so they are marked as failed.
+        """
+        with self.session_factory() as session:
+            session.query(models.Job).filter(
+                models.Job.status.in_(("queued", "running"))
+            ).update({
+                "status": "failed",
+                "error": "Interrupted by a server restart",
+                "finished_at": utc_now(),
+            }, synchronize_session=False)
+            session.commit()
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="job")
+
+    def shutdown(self) -> None:
+        """Cancel every job and wait for the workers to stop."""
+        with self._lock:
+            for event in self._cancel_events.values():
+                event.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> models.Job:
+        """
+        Queue a new job and return its row.
+
+        Raises JobQueueFull when max_pending jobs are already pending.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self._executor is None:
+            raise RuntimeError("Job runner is not started")
+
+        with self._lock:
+            if len(self._cancel_events) >= self.max_pending:
+                raise JobQueueFull()
+
+            with self.session_factory() as session:
+                job = models.Job(kind=kind, params=json.dumps(params),
+                                 status="queued")
+                session.add(job)
+                session.commit()
+                session.refresh(job)
+                session.expunge(job)
+
+            self._cancel_events[job.id] = threading.Event()
+
+        self._executor.submit(self._run, job.id)
+        return job
+
+    def get(self, job_id: int) -> Optional[models.Job]:
+        """Return the current row of a job, or None."""
+        with self.session_factory() as session:
+            job = session.get(models.Job, job_id)
+            if job is not None:
+                session.expunge(job)
+            return job
+
+    def cancel(self, job_id: int) -> Optional[models.Job]:
+        """
+        Ask a job to stop.
+
+        A queued job is marked cancelled at once, a running one stops at
+        its next chunk. Finished jobs are left as they are.
+        """
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+            if event is not None:
+                event.set()
+                self._update(job_id, cancel_requested=True)
+                self._update(job_id, expected_status="queued",
+                             status="cancelled", finished_at=utc_now())
+
+        return self.get(job_id)
+
+    def _run(self, job_id: int) -> None:
+        event = self._cancel_events[job_id]
+        try:
+            if event.is_set():
+                self._update(job_id, expected_status="queued",
+                             status="cancelled", finished_at=utc_now())
+                return
+            # Lost the race against cancel() marking the queued job
+            if not self._update(job_id, expected_status="queued",
+                                status="running", started_at=utc_now()):
+                return
+
+            job = self.get(job_id)
+            context = JobContext(self, job_id, json.loads(job.params), event)
+            result = json.dumps(self.handlers[job.kind](context))
+        except JobCancelled:
+            self._update(job_id, status="cancelled", finished_at=utc_now())
+        except Exception as error:
+            self._update(job_id, status="failed", error=str(error),
+                         finished_at=utc_now())
+        else:
+            self._update(job_id, status="succeeded", result=result,
+                         finished_at=utc_now())
+        finally:
+            with self._lock:
+                del self._cancel_events[job_id]
+
+    def _update(self, job_id: int, expected_status: Optional[str] = None,
+                **values: Any) -> bool:
+        """
+        Write job fields in a short transaction of their own.
+
+        With expected_status the row is only changed while the job still
+        has that status. Returns whether the row was changed.
+        """
+        with self.session_factory() as session:
+            query = session.query(models.Job).filter(models.Job.id == job_id)
+            if expected_status is not None:
+                query = query.filter(models.Job.status == expected_status)
+            changed = query.update(values, synchronize_session=False)
+            session.commit()
+
+        return changed > 0
+
+
+def utc_now() -> datetime:
+    """Current time in UTC, as stored by func.now() in SQLite."""
+    return datetime.now(timezone.utc)
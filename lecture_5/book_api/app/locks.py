@@ -0,0 +1,45 @@
+"""
+Per-book write locks.
+
+Writers that change a book and then update in-memory state derived from
+it (the autocomplete index) hold the book's lock from reading the row
+until the in-memory update is done, so two writers of the same book can
+not apply their updates in a different order than their commits.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class StripedLock:
+    """
+    A fixed set of locks shared by all keys.
+
+    Each key maps to one of stripes locks, so memory stays constant;
+    unrelated keys occasionally share a lock, which only costs a little
+    concurrency.
+    """
+
+    def __init__(self, stripes: int = 64):
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    @contextmanager
+    def hold(self, *keys: int) -> Iterator[None]:
+        """
+        Hold the locks of all keys.
+
+        Locks are taken in a fixed order, so callers holding several keys
+        can not deadlock each other.
+        """
+        stripes = sorted({hash(key) % len(self._locks) for key in keys})
+        for stripe in stripes:
+            self._locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self._locks[stripe].release()
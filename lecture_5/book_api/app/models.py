@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime
 from sqlalchemy.sql import func
 from database.engine import Base
 
@@ -31,3 +31,52 @@ class Book(Base):
             "year": self.year,
             "created_at": self.created_at.isoformat() if self.created_at else None
         }
+
+
+class Job(Base):
+    """
+    SQLAlchemy model for background jobs table.
+
+    Attributes:
+    - id: Primary key, auto-incrementing integer
+    - kind: Job type (reindex, dedup, export, stats)
+    - params: JSON encoded job parameters
+    - status: queued, running, succeeded, failed or cancelled
+    - processed: Number of books processed so far
+    - total: Number of books to process (known once the job starts)
+    - cancel_requested: Set when a client asks to cancel the job
+    - result: JSON encoded result of a finished job
+    - error: Error message of a failed job
+    - created_at, started_at, finished_at: Lifecycle timestamps
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    params = Column(Text, nullable=False, default="{}")
+    status = Column(String, nullable=False, default="queued", index=True)
+    processed = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class ShardLayout(Base):
+    """
+    SQLAlchemy model for the shard_layout table in books.db.
+
+    Holds a single row recording how many shard files the books are
+    spread over, so the app can refuse to start with a different count.
+
+    Attributes:
+    - id: Primary key, always 1
+    - shard_count: Number of shards the database was created with
+    """
+    __tablename__ = "shard_layout"
+
+    id = Column(Integer, primary_key=True)
+    shard_count = Column(Integer, nullable=False)
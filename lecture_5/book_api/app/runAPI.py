@@ -1,12 +1,26 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, Iterable, List, Literal, Optional, Tuple
 from contextlib import asynccontextmanager
 from datetime import datetime
+from heapq import merge
+from itertools import chain, islice
+import asyncio
 import os
 
 from . import models, schemas
-from database.engine import get_db, create_tables
+from .admission import AdmissionControlMiddleware
+from .catalog_jobs import build_handlers
+from .coalescing import SingleFlight
+from .jobs import JobQueueFull, JobRunner
+from .locks import StripedLock
+from .suggest import PrefixIndex
+from database.engine import (
+    get_shards, check_shard_layout, create_tables, shards, SessionLocal,
+    SHARD_PATHS, SUGGEST_SNAPSHOT_PATH, EXPORT_DIR)
+from database.sharding import ShardSession
 
 # Lifespan manager for application startup/shutdown events
 
@@ -19,19 +33,56 @@ async def lifespan(app: FastAPI):
     # Startup event
     print("Starting Book Collection API...")
 
+    # Refuse to start with a shard count the books were not stored with
+    check_shard_layout()
+
     # Create database tables
     create_tables()
 
     # Check database file creation
-    db_path = os.path.join(os.path.dirname(__file__),
-                           "..", "database", "books.db")
-    if os.path.exists(db_path):
-        print(f"Database created: {db_path}")
-    else:
-        print(f"Database file will be created on first request")
+    for db_path in SHARD_PATHS:
+        if os.path.exists(db_path):
+            print(f"Database created: {db_path}")
+        else:
+            print(f"Database file will be created on first request")
+
+    # Load the autocomplete index from its snapshot or rebuild it
+    db = ShardSession(shards)
+    try:
+        if suggest_index.load(SUGGEST_SNAPSHOT_PATH, book_fingerprint(db)):
+            print("Autocomplete index loaded from snapshot")
+        else:
+            suggest_index.build(chain.from_iterable(db.fan_out(
+                lambda session: session.query(
+                    models.Book.title, models.Book.author).all())))
+            print("Autocomplete index built from database")
+    finally:
+        db.close()
+
+    # The fingerprint misses edits that keep the count and highest id, so
+    # a snapshot is only trusted once: a crash before the clean shutdown
+    # below leaves none and the next start rebuilds the index
+    try:
+        os.remove(SUGGEST_SNAPSHOT_PATH)
+    except FileNotFoundError:
+        pass
+
+    # Start the background job workers
+    job_runner.start()
 
     yield
 
+    # Cancel running jobs before the index is saved; waiting for the
+    # workers happens off the event loop
+    await asyncio.get_running_loop().run_in_executor(None, job_runner.shutdown)
+
+    # Save the autocomplete index for the next start
+    db = ShardSession(shards)
+    try:
+        suggest_index.save(SUGGEST_SNAPSHOT_PATH, book_fingerprint(db))
+    finally:
+        db.close()
+
     print("Stopping Book Collection API...")
 
 # Create FastAPI application with lifespan
@@ -44,6 +95,92 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Shed load with 503 instead of queueing in the threadpool;
+# search is a full table scan, so it gets a smaller share of the workers.
+# Admitted requests (24 + 8) stay below the 40 threadpool workers, so
+# dependencies and other sync work always find a free thread
+ADMISSION_LIMITS = {
+    "max_concurrency": 24,
+    "max_queue": 64,
+    "queue_timeout": 1.0,
+    "route_limits": {"/books/search/": 8},
+    "priority_paths": ("/health",),
+}
+app.add_middleware(AdmissionControlMiddleware, **ADMISSION_LIMITS)
+
+# Identical concurrent reads share one query and one serialized response
+read_flights = SingleFlight()
+book_list_adapter = TypeAdapter(List[schemas.Book])
+
+# Deepest offset GET /books/ serves with sharding: every shard has to read
+# skip + limit ids to find the page, so deeper pages use after_id
+MAX_SHARDED_SKIP = 10_000
+
+# Prefix index behind /books/suggest, kept in sync by the write endpoints;
+# they hold the book's lock from reading the row to updating the index
+suggest_index = PrefixIndex()
+book_locks = StripedLock()
+
+# Long-running catalog operations run here instead of in request handlers;
+# job state is stored in the jobs table of books.db
+job_runner = JobRunner(
+    SessionLocal,
+    build_handlers(shards, suggest_index, book_locks, read_flights,
+                   EXPORT_DIR),
+    max_workers=2,
+    max_pending=16
+)
+
+
+def book_fingerprint(db: ShardSession) -> Tuple[int, Optional[int]]:
+    """
+    Return (number of books, highest id) to check a snapshot is current.
+    """
+    totals = db.fan_out(lambda session: session.query(
+        func.count(models.Book.id), func.max(models.Book.id)).one())
+    max_ids = [max_id for _, max_id in totals if max_id is not None]
+    return sum(count for count, _ in totals), max(max_ids, default=None)
+
+
+def merge_by_id(results: List[List[models.Book]]) -> Iterable[models.Book]:
+    """Merge per-shard results, each ordered by id, into one id order."""
+    return merge(*results, key=lambda book: book.id)
+
+
+def is_duplicate(db: ShardSession, title: str, author: str,
+                 exclude_id: Optional[int] = None) -> bool:
+    """
+    Check every shard for a book with the same title and author.
+    """
+    def find(session: Session) -> bool:
+        query = session.query(models.Book.id).filter(
+            models.Book.title.ilike(title),
+            models.Book.author.ilike(author)
+        )
+        if exclude_id is not None:
+            query = query.filter(models.Book.id != exclude_id)
+        return query.first() is not None
+
+    return any(db.fan_out(find))
+
+
+def json_response(content: bytes) -> Response:
+    """Wrap an already serialized JSON body in a response."""
+    return Response(content=content, media_type="application/json")
+
+
+def search_key(value: Optional[str]) -> Optional[str]:
+    """
+    Normalize a search term for coalescing.
+
+    SQLite ILIKE only ignores case for ASCII, so only ASCII terms are
+    lowercased; empty terms are ignored by the search, like None.
+    """
+    if not value:
+        return None
+
+    return value.lower() if value.isascii() else value
+
 
 @app.get("/", tags=["Root"])
 def read_root():
@@ -60,7 +197,11 @@ def read_root():
             "get_book": "GET /books/{id}",
             "update_book": "PUT /books/{id}",
             "delete_book": "DELETE /books/{id}",
-            "search_books": "GET /books/search/"
+            "search_books": "GET /books/search/",
+            "suggest_books": "GET /books/suggest",
+            "start_job": "POST /jobs",
+            "get_job": "GET /jobs/{id}",
+            "cancel_job": "POST /jobs/{id}/cancel"
         },
         "documentation": {
             "swagger": "/docs",
@@ -75,7 +216,7 @@ def read_root():
           tags=["Books"])
 def create_book(
     book: schemas.BookCreate,
-    db: Session = Depends(get_db)
+    db: ShardSession = Depends(get_shards)
 ) -> schemas.Book:
     """
     Add a new book to the collection.
@@ -88,22 +229,20 @@ def create_book(
     - year: Publication year
     """
     # Check if book with same title and author already exists
-    existing_book = db.query(models.Book).filter(
-        models.Book.title.ilike(book.title),
-        models.Book.author.ilike(book.author)
-    ).first()
-
-    if existing_book:
+    if is_duplicate(db, book.title, book.author):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Book '{book.title}' by {book.author} already exists"
         )
 
-    # Create new book record
-    db_book = models.Book(**book.model_dump())
-    db.add(db_book)
-    db.commit()
-    db.refresh(db_book)
+    # Create new book record on the next shard
+    session, book_id = db.for_new()
+    db_book = models.Book(id=book_id, **book.model_dump())
+    session.add(db_book)
+    session.commit()
+    session.refresh(db_book)
+    read_flights.forget_all()
+    suggest_index.add(db_book.title, db_book.author)
 
     # Convert SQLAlchemy model to Pydantic model
     return schemas.Book.model_validate(db_book)
@@ -116,16 +255,85 @@ def get_books(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=500,
                        description="Maximum number of records to return"),
-    db: Session = Depends(get_db)
-) -> List[schemas.Book]:
+    after_id: Optional[int] = Query(
+        None, ge=0, description="Only return books with a higher ID"),
+    db: ShardSession = Depends(get_shards)
+) -> Response:
     """
     Get all books with pagination support.
+
+    Deep pages are cheapest with after_id set to the last ID of the
+    previous page; with sharding, skip is limited to MAX_SHARDED_SKIP.
+    """
+    sharded = db.router.count > 1
+    if sharded and skip > MAX_SHARDED_SKIP:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"skip may not exceed {MAX_SHARDED_SKIP}, "
+                   f"page with after_id instead"
+        )
+
+    def ordered(session: Session, *columns):
+        query = session.query(*columns).order_by(models.Book.id)
+        if after_id is not None:
+            query = query.filter(models.Book.id > after_id)
+        return query
+
+    def load_page() -> bytes:
+        if not sharded:
+            books = ordered(db.session(0), models.Book).offset(
+                skip).limit(limit).all()
+        else:
+            # Any shard may hold the whole page, so the first skip + limit
+            # ids of every shard are merged and only the page's rows loaded
+            ids = list(islice(merge(*db.fan_out(
+                lambda session: [book_id for book_id, in ordered(
+                    session, models.Book.id).limit(skip + limit)])),
+                skip, skip + limit))
+            by_shard: Dict[int, List[int]] = {}
+            for book_id in ids:
+                by_shard.setdefault(db.router.shard_for(book_id),
+                                    []).append(book_id)
+            books = merge_by_id([
+                ordered(db.session(shard), models.Book).filter(
+                    models.Book.id.in_(shard_ids)).all()
+                for shard, shard_ids in by_shard.items()
+            ])
+
+        # Convert SQLAlchemy models to Pydantic models and serialize once
+        return book_list_adapter.dump_json(
+            [schemas.Book.model_validate(book) for book in books])
+
+    return json_response(
+        read_flights.do(("books", skip, limit, after_id), load_page))
+
+
+@app.get("/books/suggest",
+         response_model=List[str],
+         tags=["Search"])
+def suggest_books(
+    prefix: str = Query(..., min_length=1, max_length=200,
+                        description="Beginning of the title or author"),
+    field: Literal["title", "author"] = Query(
+        "title", description="Field to complete"),
+    limit: int = Query(10, ge=1, le=50,
+                       description="Maximum number of suggestions")
+) -> List[str]:
     """
-    # Query books with pagination
-    books = db.query(models.Book).offset(skip).limit(limit).all()
+    Autocomplete titles or authors (case-insensitive prefix match).
+
+    Served from the in-memory index, the database is not queried.
+    """
+    return suggest_index.suggest(field, prefix, limit)
+
 
-    # Convert SQLAlchemy models to Pydantic models
-    return [schemas.Book.model_validate(book) for book in books]
+@app.get("/books/suggest/stats",
+         tags=["Search"])
+def suggest_stats():
+    """
+    Size and approximate memory footprint of the autocomplete index.
+    """
+    return suggest_index.stats()
 
 
 @app.get("/books/{book_id}",
@@ -133,23 +341,27 @@ def get_books(
          tags=["Books"])
 def get_book(
     book_id: int,
-    db: Session = Depends(get_db)
-) -> schemas.Book:
+    db: ShardSession = Depends(get_shards)
+) -> Response:
     """
     Get a specific book by its ID.
 
     Required parameter:
     - book_id: The unique identifier of the book
     """
-    db_book = db.query(models.Book).filter(models.Book.id == book_id).first()
-    if db_book is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Book with ID {book_id} not found"
-        )
+    def load_book() -> bytes:
+        db_book = db.for_id(book_id).query(models.Book).filter(
+            models.Book.id == book_id).first()
+        if db_book is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Book with ID {book_id} not found"
+            )
 
-    # Convert SQLAlchemy model to Pydantic model
-    return schemas.Book.model_validate(db_book)
+        # Convert SQLAlchemy model to Pydantic model and serialize once
+        return schemas.Book.model_validate(db_book).model_dump_json().encode()
+
+    return json_response(read_flights.do(("book", book_id), load_book))
 
 
 @app.put("/books/{book_id}",
@@ -158,7 +370,7 @@ def get_book(
 def update_book(
     book_id: int,
     book_update: schemas.BookUpdate,
-    db: Session = Depends(get_db)
+    db: ShardSession = Depends(get_shards)
 ) -> schemas.Book:
     """
     Update book information.
@@ -171,42 +383,44 @@ def update_book(
     - author: New book author
     - year: New publication year
     """
-    # Find the book to update
-    db_book = db.query(models.Book).filter(models.Book.id == book_id).first()
-
-    if db_book is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Book with ID {book_id} not found"
-        )
+    # Find the book to update on its shard; the lock keeps concurrent
+    # writers of this book from updating the index out of commit order
+    session = db.for_id(book_id)
+    with book_locks.hold(book_id):
+        db_book = session.query(models.Book).filter(
+            models.Book.id == book_id).first()
+
+        if db_book is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Book with ID {book_id} not found"
+            )
 
-    update_data = book_update.model_dump(exclude_unset=True)
+        update_data = book_update.model_dump(exclude_unset=True)
 
-    # Check if update would create a duplicate book
-    if 'title' in update_data or 'author' in update_data:
-        new_title = update_data.get('title', db_book.title)
-        new_author = update_data.get('author', db_book.author)
+        # Check if update would create a duplicate book
+        if 'title' in update_data or 'author' in update_data:
+            new_title = update_data.get('title', db_book.title)
+            new_author = update_data.get('author', db_book.author)
 
-        # Look for other books with same title and author
-        existing = db.query(models.Book).filter(
-            models.Book.title.ilike(new_title),
-            models.Book.author.ilike(new_author),
-            models.Book.id != book_id
-        ).first()
+            # Look for other books with same title and author
+            if is_duplicate(db, new_title, new_author, exclude_id=book_id):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Book with this title and author already exists"
+                )
 
-        if existing:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Book with this title and author already exists"
-            )
+        old_entry = (db_book.title, db_book.author)
 
-    # Apply updates to the database model
-    for field, value in update_data.items():
-        setattr(db_book, field, value)
+        # Apply updates to the database model
+        for field, value in update_data.items():
+            setattr(db_book, field, value)
 
-    # Save changes
-    db.commit()
-    db.refresh(db_book)
+        # Save changes
+        session.commit()
+        session.refresh(db_book)
+        read_flights.forget_all()
+        suggest_index.replace(old_entry, (db_book.title, db_book.author))
 
     # Return updated book as Pydantic model
     return schemas.Book.model_validate(db_book)
@@ -217,7 +431,7 @@ def update_book(
             tags=["Books"])
 def delete_book(
     book_id: int,
-    db: Session = Depends(get_db)
+    db: ShardSession = Depends(get_shards)
 ):
     """
     Delete a book by its ID.
@@ -225,18 +439,25 @@ def delete_book(
     Required parameter:
     - book_id: The unique identifier of the book to delete
     """
-    # Find the book to delete
-    book = db.query(models.Book).filter(models.Book.id == book_id).first()
+    # Find the book to delete on its shard, under the book's lock
+    session = db.for_id(book_id)
+    with book_locks.hold(book_id):
+        book = session.query(models.Book).filter(
+            models.Book.id == book_id).first()
 
-    if book is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Book with ID {book_id} not found"
-        )
+        if book is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Book with ID {book_id} not found"
+            )
+
+        entry = (book.title, book.author)
 
-    # Delete the book
-    db.delete(book)
-    db.commit()
+        # Delete the book
+        session.delete(book)
+        session.commit()
+        read_flights.forget_all()
+        suggest_index.remove(*entry)
 
     # Return 204 No Content (empty response)
     return
@@ -252,8 +473,8 @@ def search_books(
         None, description="Search by author (partial match)"),
     year: Optional[int] = Query(
         None, description="Search by exact publication year"),
-    db: Session = Depends(get_db)
-) -> List[schemas.Book]:
+    db: ShardSession = Depends(get_shards)
+) -> Response:
     """
     Search books by various criteria.
 
@@ -262,30 +483,112 @@ def search_books(
     - author: Partial match on author name (case-insensitive)
     - year: Exact publication year
     """
-    # Start with base query
-    query = db.query(models.Book)
+    def search_shard(session: Session) -> List[models.Book]:
+        # Start with base query
+        query = session.query(models.Book).order_by(models.Book.id)
+
+        # Apply filters based on provided parameters
+        if title:
+            query = query.filter(models.Book.title.ilike(f"%{title}%"))
+
+        if author:
+            query = query.filter(models.Book.author.ilike(f"%{author}%"))
+
+        if year:
+            query = query.filter(models.Book.year == year)
+
+        # Execute query and get results
+        return query.all()
+
+    def run_search() -> bytes:
+        # Search every shard in parallel and merge the results by id
+        books = merge_by_id(db.fan_out(search_shard))
+
+        # Convert SQLAlchemy models to Pydantic models and serialize once
+        return book_list_adapter.dump_json(
+            [schemas.Book.model_validate(book) for book in books])
+
+    key = ("search", search_key(title), search_key(author), year or None)
+    return json_response(read_flights.do(key, run_search))
+
+
+@app.post("/jobs",
+          response_model=schemas.JobResponse,
+          status_code=status.HTTP_202_ACCEPTED,
+          tags=["Jobs"])
+def start_job(job: schemas.JobCreate) -> schemas.JobResponse:
+    """
+    Start a background job.
 
-    # Apply filters based on provided parameters
-    if title:
-        query = query.filter(models.Book.title.ilike(f"%{title}%"))
+    Required field:
+    - kind: reindex, dedup, export or stats
 
-    if author:
-        query = query.filter(models.Book.author.ilike(f"%{author}%"))
+    Optional field:
+    - params: Job options, e.g. {"dry_run": false} for dedup
+    """
+    try:
+        db_job = job_runner.submit(job.kind, job.params)
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many jobs are pending, try again later",
+            headers={"Retry-After": "10"}
+        )
+
+    return schemas.JobResponse.model_validate(db_job)
+
+
+@app.get("/jobs/{job_id}",
+         response_model=schemas.JobResponse,
+         tags=["Jobs"])
+def get_job(job_id: int) -> schemas.JobResponse:
+    """
+    Get the status, progress and result of a job.
+
+    Required parameter:
+    - job_id: The unique identifier of the job
+    """
+    db_job = job_runner.get(job_id)
+    if db_job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with ID {job_id} not found"
+        )
+
+    return schemas.JobResponse.model_validate(db_job)
+
+
+@app.post("/jobs/{job_id}/cancel",
+          response_model=schemas.JobResponse,
+          status_code=status.HTTP_202_ACCEPTED,
+          tags=["Jobs"])
+def cancel_job(job_id: int) -> schemas.JobResponse:
+    """
+    Cancel a queued or running job.
 
-    if year:
-        query = query.filter(models.Book.year == year)
+    Running jobs stop after their current chunk; finished jobs are
+    returned unchanged.
 
-    # Execute query and get results
-    books = query.all()
+    Required parameter:
+    - job_id: The unique identifier of the job
+    """
+    db_job = job_runner.cancel(job_id)
+    if db_job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with ID {job_id} not found"
+        )
 
-    # Convert SQLAlchemy models to Pydantic models
-    return [schemas.Book.model_validate(book) for book in books]
+    return schemas.JobResponse.model_validate(db_job)
 
 
 @app.get("/health", tags=["Health"])
-def health_check():
+async def health_check():
     """
     Health check endpoint for monitoring and load balancers.
+
+    Runs on the event loop, so it answers even when every worker thread
+    is busy.
     """
     return {
         "status": "healthy",
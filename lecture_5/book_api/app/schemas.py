@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, Field, ConfigDict, field_validator
+from typing import Any, Dict, Literal, Optional
+import json
 from datetime import datetime
 
 # Base book schema
@@ -78,3 +79,62 @@ class BookUpdate(BaseModel):
 
 
 Book = BookResponse
+
+
+# Schema for starting a background job
+
+
+class JobCreate(BaseModel):
+    """
+    Schema for starting a background job.
+
+    Fields:
+    - kind: reindex, dedup, export or stats
+    - params: Job options, e.g. {"dry_run": false} for dedup
+    """
+    kind: Literal["reindex", "dedup", "export", "stats"]
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "kind": "dedup",
+                "params": {"dry_run": True}
+            }
+        }
+    )
+
+# Schema for job response
+
+
+class JobResponse(BaseModel):
+    """
+    Schema for background job state.
+
+    Fields:
+    - id: Unique job identifier
+    - status: queued, running, succeeded, failed or cancelled
+    - processed / total: Progress in books
+    - result: Job result once it succeeded
+    - error: Error message if it failed
+    """
+    id: int
+    kind: str
+    params: Dict[str, Any]
+    status: str
+    processed: int
+    total: Optional[int] = None
+    cancel_requested: bool
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @field_validator("params", "result", mode="before")
+    @classmethod
+    def decode_json(cls, value: Any) -> Any:
+        """Decode JSON columns stored as text."""
+        return json.loads(value) if isinstance(value, str) else value
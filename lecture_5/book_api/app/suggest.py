@@ -0,0 +1,209 @@
+"""
+In-memory prefix index for title/author autocomplete.
+
+Each field keeps a sorted array of casefolded values, so a prefix lookup
+is one binary search plus a short forward scan. The index is built at
+startup, updated by the write endpoints and can be saved to a compact
+snapshot for fast warm restarts. The app deletes the snapshot once it
+is loaded and writes a new one on clean shutdown, so a crash never
+leaves a stale one behind.
+"""
+
+import gzip
+import json
+import os
+import sys
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+FIELDS = ("title", "author")
+SNAPSHOT_VERSION = 1
+# Separates the casefolded sort key from the original spelling in an entry;
+# it sorts before every other character, so entries sort by key first
+SEPARATOR = "\0"
+
+
+def make_entry(value: str) -> str:
+    """Return the index entry for a title or author."""
+    return f"{value.casefold()}{SEPARATOR}{value}"
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index over book titles and authors.
+
+    Per field:
+    - entries: Sorted list of "casefolded\\0Original" strings, one per
+      distinct spelling
+    - counts: Entry -> number of books using that spelling
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[str]] = {field: [] for field in FIELDS}
+        self._counts: Dict[str, Dict[str, int]] = {field: {} for field in FIELDS}
+
+    def build(self, rows: Iterable[Tuple[str, str]]) -> None:
+        """
+        Replace the index contents with (title, author) rows.
+        """
+        counts: Dict[str, Dict[str, int]] = {field: {} for field in FIELDS}
+        for row in rows:
+            for field, value in zip(FIELDS, row):
+                entry = make_entry(value)
+                counts[field][entry] = counts[field].get(entry, 0) + 1
+
+        with self._lock:
+            self._counts = counts
+            self._entries = {field: sorted(counts[field]) for field in FIELDS}
+
+    def add(self, title: str, author: str) -> None:
+        """Add one book to the index."""
+        with self._lock:
+            self._add("title", title)
+            self._add("author", author)
+
+    def remove(self, title: str, author: str) -> None:
+        """Remove one book from the index."""
+        with self._lock:
+            self._remove("title", title)
+            self._remove("author", author)
+
+    def replace(self, old: Tuple[str, str], new: Tuple[str, str]) -> None:
+        """Move one book from its old (title, author) to the new one."""
+        with self._lock:
+            for field, old_value, new_value in zip(FIELDS, old, new):
+                if old_value != new_value:
+                    self._remove(field, old_value)
+                    self._add(field, new_value)
+
+    def suggest(self, field: str, prefix: str, limit: int) -> List[str]:
+        """
+        Return up to limit values of field starting with prefix,
+        ignoring case, in alphabetical order.
+        """
+        prefix = prefix.casefold().replace(SEPARATOR, "")
+        suggestions: List[str] = []
+        with self._lock:
+            entries = self._entries[field]
+            position = bisect_left(entries, prefix)
+            while (position < len(entries) and len(suggestions) < limit
+                   and entries[position].startswith(prefix)):
+                suggestions.append(entries[position].split(SEPARATOR, 1)[1])
+                position += 1
+
+        return suggestions
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Return the number of distinct values and the approximate memory
+        footprint in bytes of each field.
+        """
+        with self._lock:
+            return {
+                field: {
+                    "entries": len(self._entries[field]),
+                    "memory_bytes": self._memory_bytes(field),
+                }
+                for field in FIELDS
+            }
+
+    def save(self, path: str, fingerprint: Sequence[Optional[int]]) -> None:
+        """
+        Write a gzipped snapshot of the index.
+
+        Entries are stored already sorted with their book counts, so loading
+        needs no sorting or casefolding. fingerprint identifies the database state the
+        snapshot belongs to.
+        """
+        with self._lock:
+            snapshot = {
+                "version": SNAPSHOT_VERSION,
+                "fingerprint": list(fingerprint),
+                **{
+                    field: {
+                        "entries": self._entries[field],
+                        "counts": [self._counts[field][entry]
+                                   for entry in self._entries[field]],
+                    }
+                    for field in FIELDS
+                },
+            }
+
+        temp_path = f"{path}.tmp"
+        data = json.dumps(snapshot, ensure_ascii=False, separators=(",", ":"))
+        with gzip.open(temp_path, "wb", compresslevel=6) as file:
+            file.write(data.encode("utf-8"))
+        os.replace(temp_path, path)
+
+    def load(self, path: str, fingerprint: Sequence[Optional[int]]) -> bool:
+        """
+        Load a snapshot written by save().
+
+        Returns False (and leaves the index untouched) when there is no
+        usable snapshot for this fingerprint.
+        """
+        try:
+            with gzip.open(path, "rb") as file:
+                snapshot = json.loads(file.read().decode("utf-8"))
+        except (OSError, ValueError):
+            return False
+
+        if not isinstance(snapshot, dict):
+            return False
+
+        if (snapshot.get("version") != SNAPSHOT_VERSION
+                or snapshot.get("fingerprint") != list(fingerprint)):
+            return False
+
+        entries: Dict[str, List[str]] = {}
+        counts: Dict[str, Dict[str, int]] = {}
+        try:
+            for field in FIELDS:
+                entries[field] = snapshot[field]["entries"]
+                field_counts = snapshot[field]["counts"]
+                if (not isinstance(entries[field], list)
+                        or not isinstance(field_counts, list)
+                        or len(entries[field]) != len(field_counts)
+                        or not all(isinstance(entry, str)
+                                   for entry in entries[field])
+                        or not all(isinstance(count, int)
+                                   for count in field_counts)):
+                    return False
+                counts[field] = dict(zip(entries[field], field_counts))
+        except (KeyError, TypeError):
+            # Right version and fingerprint but a damaged body
+            return False
+
+        with self._lock:
+            self._entries = entries
+            self._counts = counts
+
+        return True
+
+    def _add(self, field: str, value: str) -> None:
+        entry = make_entry(value)
+        counts = self._counts[field]
+        if entry not in counts:
+            counts[entry] = 0
+            insort(self._entries[field], entry)
+        counts[entry] += 1
+
+    def _remove(self, field: str, value: str) -> None:
+        entry = make_entry(value)
+        counts = self._counts[field]
+        if entry not in counts:
+            return
+
+        counts[entry] -= 1
+        if counts[entry] == 0:
+            del counts[entry]
+            entries = self._entries[field]
+            del entries[bisect_left(entries, entry)]
+
+    def _memory_bytes(self, field: str) -> int:
+        entries = self._entries[field]
+        # Strings are shared between the list and the dict
+        return (sys.getsizeof(entries) + sys.getsizeof(self._counts[field])
+                + sum(sys.getsizeof(entry) for entry in entries))
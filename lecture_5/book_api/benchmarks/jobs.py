@@ -0,0 +1,156 @@
+"""
+Foreground latency while background jobs run.
+
+Measures GET /books/{id} and POST /books/ latency on a temporary
+database while idle, while export + dedup jobs run in chunks, and while
+the same jobs read everything in a single chunk.
+
+Usage:
+    python benchmarks/jobs.py
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import catalog_jobs, models, runAPI  # noqa: E402
+from app.jobs import JobRunner  # noqa: E402
+from database.engine import Base, enable_wal, get_shards  # noqa: E402
+from database.sharding import ShardRouter, ShardSession  # noqa: E402
+
+BOOKS = 200_000
+CLIENTS = 8         # Concurrent foreground clients
+IDLE_SECONDS = 10.0
+JOBS = [("export", {}), ("dedup", {"dry_run": True})]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the given percentile of a list of latencies."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def setup(tmp_dir: str) -> None:
+    """
+    Point the app at a seeded temporary database and a fresh job runner
+    """
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'books.db')}",
+                           connect_args={"check_same_thread": False})
+    enable_wal(engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(models.Book.__table__.insert(), [
+            {"title": f"Book {i}", "author": f"Author {i % 5000}",
+             "year": 1900 + i % 120}
+            for i in range(BOOKS)
+        ])
+
+    router = ShardRouter([engine])
+
+    def get_test_shards():
+        db = ShardSession(router)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    runAPI.app.dependency_overrides[get_shards] = get_test_shards
+    # Measure the jobs alone, not admission control shedding
+    runAPI.app.user_middleware.clear()
+    runAPI.job_runner = JobRunner(
+        sessionmaker(autocommit=False, autoflush=False, bind=engine),
+        catalog_jobs.build_handlers(router, runAPI.suggest_index,
+                                    runAPI.book_locks, runAPI.read_flights,
+                                    os.path.join(tmp_dir, "exports")))
+    runAPI.job_runner.start()
+
+
+async def measure(with_jobs: bool) -> Dict[str, float]:
+    """
+    Run foreground clients, optionally until the jobs have finished
+    """
+    latencies: List[float] = []
+    rng = random.Random(1)
+    transport = httpx.ASGITransport(app=runAPI.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test",
+                                 timeout=None) as client:
+        job_ids = []
+        if with_jobs:
+            for kind, params in JOBS:
+                response = await client.post(
+                    "/jobs", json={"kind": kind, "params": params})
+                job_ids.append(response.json()["id"])
+
+        start = time.perf_counter()
+
+        async def running() -> bool:
+            if not with_jobs:
+                return time.perf_counter() - start < IDLE_SECONDS
+            for job_id in job_ids:
+                job = (await client.get(f"/jobs/{job_id}")).json()
+                if job["status"] in ("queued", "running"):
+                    return True
+            return False
+
+        async def foreground(client_id: int) -> None:
+            i = 0
+            while await running():
+                request_start = time.perf_counter()
+                if i % 4 == 0:
+                    await client.post("/books/", json={
+                        "title": f"New {client_id}-{i}-{with_jobs}-{start}",
+                        "author": "Bench"})
+                else:
+                    await client.get(f"/books/{rng.randint(1, BOOKS)}")
+                latencies.append(time.perf_counter() - request_start)
+                i += 1
+
+        await asyncio.gather(*(foreground(n) for n in range(CLIENTS)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "seconds": elapsed,
+    }
+
+
+def main() -> None:
+    """Run the scenarios and print a table."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup(tmp_dir)
+        print(f"{CLIENTS} clients (3 GET : 1 POST), {BOOKS} books, "
+              f"jobs: {', '.join(kind for kind, _ in JOBS)}")
+        print(f"{'':<26}{'requests':>9}{'p50 ms':>9}{'p99 ms':>9}"
+              f"{'max ms':>9}{'seconds':>9}")
+        scenarios = [
+            ("idle", False, catalog_jobs.CHUNK_SIZE),
+            (f"jobs, {catalog_jobs.CHUNK_SIZE}-row chunks", True,
+             catalog_jobs.CHUNK_SIZE),
+            ("jobs, single chunk", True, BOOKS * 2),
+        ]
+        for label, with_jobs, chunk_size in scenarios:
+            catalog_jobs.CHUNK_SIZE = chunk_size
+            stats = asyncio.run(measure(with_jobs))
+            print(f"{label:<26}{stats['requests']:>9}{stats['p50_ms']:>9.1f}"
+                  f"{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.0f}"
+                  f"{stats['seconds']:>9.1f}")
+        runAPI.job_runner.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Overload test for AdmissionControlMiddleware.
+
+Sends book and search requests at twice the rate the service can
+handle, plus a steady stream of health checks, once without and once
+with the app's admission limits (runAPI.ADMISSION_LIMITS), and prints
+latency percentiles for both runs.
+
+Usage:
+    python benchmarks/overload.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+from fastapi import FastAPI
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.admission import AdmissionControlMiddleware  # noqa: E402
+from app.runAPI import ADMISSION_LIMITS, health_check  # noqa: E402
+
+WORK_SECONDS = 0.1      # Time one data request holds a worker thread
+THREADS = 40            # Default size of the anyio threadpool
+ARRIVAL_RATE = 640      # /books/ requests per second
+SEARCH_RATE = 160       # /books/search/ requests per second
+DURATION = 3.0          # Seconds of overload
+HEALTH_INTERVAL = 0.05  # Seconds between health probes
+
+
+def build_app(admission: bool) -> FastAPI:
+    """
+    Build a demo app whose data endpoints block a worker like a DB query,
+    with the real health check and admission limits
+    """
+    app = FastAPI()
+
+    @app.get("/books/")
+    def get_books() -> dict:
+        time.sleep(WORK_SECONDS)
+        return {"books": []}
+
+    @app.get("/books/search/")
+    def search_books() -> dict:
+        time.sleep(WORK_SECONDS)
+        return {"books": []}
+
+    app.get("/health")(health_check)
+
+    if admission:
+        app.add_middleware(AdmissionControlMiddleware, **ADMISSION_LIMITS)
+
+    return app
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the given percentile of a list of latencies."""
+    if not values:
+        return float("nan")
+
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def timed_get(client: httpx.AsyncClient, path: str,
+                    results: List[tuple]) -> None:
+    """Send one request and record (status, latency)."""
+    start = time.perf_counter()
+    response = await client.get(path)
+    results.append((response.status_code, time.perf_counter() - start))
+
+
+async def run(admission: bool) -> Dict[str, float]:
+    """
+    Run one overload scenario and summarise the latencies
+    """
+    transport = httpx.ASGITransport(app=build_app(admission))
+    data: List[tuple] = []
+    health: List[tuple] = []
+    tasks = []
+
+    async with httpx.AsyncClient(transport=transport,
+                                 base_url="http://test",
+                                 timeout=None) as client:
+        start = time.perf_counter()
+        next_health = start
+        sent = 0
+        searched = 0
+        while (now := time.perf_counter()) - start < DURATION:
+            # Open-loop arrivals: keep sending regardless of responses
+            while sent < (now - start) * ARRIVAL_RATE:
+                tasks.append(asyncio.create_task(
+                    timed_get(client, "/books/", data)))
+                sent += 1
+            while searched < (now - start) * SEARCH_RATE:
+                tasks.append(asyncio.create_task(
+                    timed_get(client, "/books/search/", data)))
+                searched += 1
+            if now >= next_health:
+                tasks.append(asyncio.create_task(
+                    timed_get(client, "/health", health)))
+                next_health += HEALTH_INTERVAL
+            await asyncio.sleep(0.001)
+
+        await asyncio.gather(*tasks)
+
+    served = [latency for status, latency in data if status == 200]
+    health_latency = [latency for _, latency in health]
+    return {
+        "sent": len(data),
+        "served": len(served),
+        "shed_503": sum(1 for status, _ in data if status == 503),
+        "p50_ms": percentile(served, 0.50) * 1000,
+        "p99_ms": percentile(served, 0.99) * 1000,
+        "max_ms": max(served, default=float("nan")) * 1000,
+        "health_p99_ms": percentile(health_latency, 0.99) * 1000,
+    }
+
+
+def main() -> None:
+    """Run both scenarios and print a comparison table."""
+    print(f"Overload: {ARRIVAL_RATE} + {SEARCH_RATE} search req/s for "
+          f"{DURATION:.0f}s, capacity {THREADS / WORK_SECONDS:.0f} req/s")
+    print(f"{'':<20}{'sent':>7}{'served':>8}{'503':>7}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'health p99':>12}")
+    for admission in (False, True):
+        stats = asyncio.run(run(admission))
+        label = "admission control" if admission else "no limit"
+        print(f"{label:<20}{stats['sent']:>7}{stats['served']:>8}"
+              f"{stats['shed_503']:>7}{stats['p50_ms']:>9.0f}"
+              f"{stats['p99_ms']:>9.0f}{stats['max_ms']:>9.0f}"
+              f"{stats['health_p99_ms']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Write throughput of the sharded books database.
+
+Concurrent writers insert books one transaction at a time (like
+POST /books/) into 1, 2, 4 and 8 shard files and the inserts per second
+are printed for each shard count.
+
+Usage:
+    python benchmarks/sharding.py [directory for the shard files]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import models  # noqa: E402
+from database.engine import Base  # noqa: E402
+from database.sharding import ShardRouter, ShardSession  # noqa: E402
+
+WRITERS = 16              # Concurrent writer threads
+BOOKS_PER_WRITER = 250
+SHARD_COUNTS = (1, 2, 4, 8)
+
+
+def run(shard_count: int, directory: str) -> float:
+    """
+    Insert WRITERS * BOOKS_PER_WRITER books and return inserts per second
+    """
+    engines = [
+        create_engine(
+            f"sqlite:///{os.path.join(directory, f'books_{shard_count}_{shard}.db')}",
+            connect_args={"check_same_thread": False, "timeout": 60},
+            pool_size=WRITERS)
+        for shard in range(shard_count)
+    ]
+    router = ShardRouter(engines)
+    router.create_all(Base.metadata)
+
+    def write(writer: int) -> None:
+        for i in range(BOOKS_PER_WRITER):
+            db = ShardSession(router)
+            try:
+                session, book_id = db.for_new()
+                session.add(models.Book(id=book_id, title=f"Book {writer}-{i}",
+                                        author=f"Author {writer}", year=2000))
+                session.commit()
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=write, args=(writer,))
+               for writer in range(WRITERS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    for engine in engines:
+        engine.dispose()
+
+    return WRITERS * BOOKS_PER_WRITER / elapsed
+
+
+def main() -> None:
+    """Run every shard count and print a table."""
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        print(f"{WRITERS} writers, {WRITERS * BOOKS_PER_WRITER} inserts "
+              f"(one commit each) in {tmp_dir}")
+        print(f"{'shards':>7}{'inserts/s':>12}{'speedup':>9}")
+        baseline = None
+        for shard_count in SHARD_COUNTS:
+            rate = run(shard_count, tmp_dir)
+            baseline = baseline or rate
+            print(f"{shard_count:>7}{rate:>12.0f}{rate / baseline:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark for the autocomplete PrefixIndex.
+
+Builds the index over generated titles/authors and prints build time,
+memory footprint, lookup latency and snapshot save/load times.
+
+Usage:
+    python benchmarks/suggest.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.suggest import PrefixIndex  # noqa: E402
+
+BOOKS = 1_000_000
+AUTHORS = 50_000
+LOOKUPS = 100_000
+WORDS = ["the", "war", "peace", "night", "garden", "river", "silent", "city",
+         "of", "a", "last", "empire", "glass", "winter", "song", "house",
+         "dark", "sea", "stars", "memory", "letters", "road", "kingdom"]
+
+
+def generate_books(rng: random.Random) -> List[Tuple[str, str]]:
+    """Return BOOKS random (title, author) rows."""
+    authors = [f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}son {i}"
+               for i in range(AUTHORS)]
+    return [
+        (" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title()
+         + f" {i}", rng.choice(authors))
+        for i in range(BOOKS)
+    ]
+
+
+def main() -> None:
+    """Run the benchmark and print the results."""
+    rng = random.Random(42)
+    books = generate_books(rng)
+    index = PrefixIndex()
+
+    start = time.perf_counter()
+    index.build(books)
+    print(f"Build from {BOOKS} rows: {time.perf_counter() - start:.2f} s")
+    for field, stats in index.stats().items():
+        print(f"  {field}: {stats['entries']} entries, "
+              f"{stats['memory_bytes'] / 2 ** 20:.1f} MiB")
+
+    prefixes = [(rng.choice(("title", "author")),
+                 rng.choice(WORDS)[:rng.randint(1, 4)]) for _ in range(LOOKUPS)]
+    latencies = []
+    for field, prefix in prefixes:
+        start = time.perf_counter()
+        index.suggest(field, prefix, 10)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"{LOOKUPS} lookups, limit 10: "
+          f"p50 {latencies[LOOKUPS // 2] * 1e6:.1f} us, "
+          f"p99 {latencies[int(LOOKUPS * 0.99)] * 1e6:.1f} us")
+
+    start = time.perf_counter()
+    for i in range(10_000):
+        index.add(f"New Book {i}", f"New Author {i}")
+    print(f"10000 incremental adds: {time.perf_counter() - start:.2f} s")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "suggest_index.json.gz")
+        start = time.perf_counter()
+        index.save(path, (BOOKS, BOOKS))
+        print(f"Snapshot save: {time.perf_counter() - start:.2f} s, "
+              f"{os.path.getsize(path) / 2 ** 20:.1f} MiB on disk")
+
+        start = time.perf_counter()
+        assert PrefixIndex().load(path, (BOOKS, BOOKS))
+        print(f"Snapshot load: {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Thundering-herd test for single-flight read coalescing.
+
+Fires a burst of identical concurrent search requests at the Book API
+(backed by a temporary database), once with coalescing disabled and
+once enabled, and prints the number of SQL queries and the latencies.
+
+Usage:
+    python benchmarks/thundering_herd.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import models, runAPI  # noqa: E402
+from app.coalescing import SingleFlight  # noqa: E402
+from database.engine import Base, get_shards  # noqa: E402
+from database.sharding import ShardRouter, ShardSession  # noqa: E402
+
+BOOKS = 200_000   # Rows scanned by every search
+REQUESTS = 200    # Identical requests in the burst
+SEARCH_URL = "/books/search/?author=orwell"
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the given percentile of a list of latencies."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def seed_database(db_path: str) -> sessionmaker:
+    """
+    Create a temporary books database and return its session factory
+    """
+    engine = create_engine(f"sqlite:///{db_path}",
+                           connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(models.Book.__table__.insert(), [
+            {"title": f"Book {i}",
+             "author": "George Orwell" if i % 1000 == 0 else f"Author {i}",
+             "year": 1900 + i % 120}
+            for i in range(BOOKS)
+        ])
+
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+async def herd(enabled: bool, session_factory: sessionmaker) -> Dict[str, float]:
+    """
+    Send REQUESTS identical searches at once and count the SQL queries
+    """
+    queries = 0
+
+    def count_query(*args) -> None:
+        nonlocal queries
+        queries += 1
+
+    engine = session_factory.kw["bind"]
+    event.listen(engine, "before_cursor_execute", count_query)
+    runAPI.read_flights = SingleFlight(enabled=enabled)
+
+    latencies: List[float] = []
+
+    async def search(client: httpx.AsyncClient) -> None:
+        start = time.perf_counter()
+        response = await client.get(SEARCH_URL)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+    transport = httpx.ASGITransport(app=runAPI.app)
+    async with httpx.AsyncClient(transport=transport,
+                                 base_url="http://test",
+                                 timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(search(client) for _ in range(REQUESTS)))
+        elapsed = time.perf_counter() - start
+
+    event.remove(engine, "before_cursor_execute", count_query)
+    return {
+        "queries": queries,
+        "coalesced": runAPI.read_flights.coalesced,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "total_s": elapsed,
+    }
+
+
+def main() -> None:
+    """Run the burst with and without coalescing and print a table."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        session_factory = seed_database(os.path.join(tmp_dir, "books.db"))
+
+        router = ShardRouter([session_factory.kw["bind"]])
+
+        def get_test_shards():
+            db = ShardSession(router)
+            try:
+                yield db
+            finally:
+                db.close()
+
+        runAPI.app.dependency_overrides[get_shards] = get_test_shards
+        # Measure coalescing alone, not admission control shedding
+        runAPI.app.user_middleware.clear()
+
+        print(f"{REQUESTS} concurrent GET {SEARCH_URL} over {BOOKS} books")
+        print(f"{'':<16}{'queries':>9}{'coalesced':>11}"
+              f"{'p50 ms':>9}{'p99 ms':>9}{'total s':>9}")
+        for enabled in (False, True):
+            stats = asyncio.run(herd(enabled, session_factory))
+            label = "single-flight" if enabled else "no coalescing"
+            print(f"{label:<16}{stats['queries']:>9}{stats['coalesced']:>11}"
+                  f"{stats['p50_ms']:>9.0f}{stats['p99_ms']:>9.0f}"
+                  f"{stats['total_s']:>9.2f}")
+        session_factory.kw["bind"].dispose()
+
+
+if __name__ == "__main__":
+    main()
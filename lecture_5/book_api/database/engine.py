@@ -1,14 +1,23 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, func, inspect, select
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
+from database.sharding import ShardRouter, ShardSession
+
 # Get project base directory
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Define database file path in the database folder
 DATABASE_PATH = os.path.join(BASE_DIR, "database", "books.db")
 
+# Snapshot of the autocomplete index, reloaded on warm restarts
+SUGGEST_SNAPSHOT_PATH = os.path.join(BASE_DIR, "database", "suggest_index.json.gz")
+
+# Output directory of export jobs
+EXPORT_DIR = os.path.join(BASE_DIR, "database", "exports")
+
 # Create database directory if it doesn't exist
 os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
 
@@ -22,9 +31,48 @@ engine = create_engine(
     echo=False
 )
 
+
+def enable_wal(engine: Engine) -> None:
+    """
+    Switch connections of engine to WAL journal mode.
+
+    Readers then no longer block the writer, so chunked background jobs
+    and foreground requests can interleave on the same file.
+    """
+    @event.listens_for(engine, "connect")
+    def set_journal_mode(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+
+enable_wal(engine)
+
 # Session factory for database sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional sharded mode: BOOKS_DB_SHARDS=N spreads books over
+# database/books_0.db ... books_{N-1}.db instead of books.db
+SHARD_COUNT = max(1, int(os.environ.get("BOOKS_DB_SHARDS", "1")))
+
+if SHARD_COUNT > 1:
+    SHARD_PATHS = [os.path.join(BASE_DIR, "database", f"books_{shard}.db")
+                   for shard in range(SHARD_COUNT)]
+    shard_engines = [
+        create_engine(f"sqlite:///{path}",
+                      connect_args={"check_same_thread": False},
+                      echo=False)
+        for path in SHARD_PATHS
+    ]
+    for shard_engine in shard_engines:
+        enable_wal(shard_engine)
+else:
+    SHARD_PATHS = [DATABASE_PATH]
+    shard_engines = [engine]
+
+# Routes books to their shard; with one shard it simply wraps engine
+shards = ShardRouter(shard_engines)
+
 # Base class for SQLAlchemy models
 Base = declarative_base()
 
@@ -45,6 +93,62 @@ def get_db():
         db.close()
 
 
+def get_shards():
+    """
+    Shard-aware dependency used instead of get_db by the book endpoints.
+
+    Yields:
+    - ShardSession opening sessions on the shards the request touches
+
+    Ensures every opened session is properly closed after use.
+    """
+    db = ShardSession(shards)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def check_shard_layout():
+    """
+    Make sure BOOKS_DB_SHARDS matches the layout of the existing database.
+
+    Books are routed by (id - 1) % SHARD_COUNT, so starting with another
+    shard count would silently hide existing books. The count is recorded
+    in books.db on first start and checked on every later one.
+
+    Raises RuntimeError on a mismatch, or when sharded mode is enabled
+    while books.db still holds books (see the README to migrate them).
+    """
+    # Import models here to avoid circular imports
+    from app import models
+
+    Base.metadata.create_all(bind=engine,
+                             tables=[models.ShardLayout.__table__])
+
+    if SHARD_COUNT > 1 and inspect(engine).has_table(models.Book.__tablename__):
+        with engine.connect() as connection:
+            unsharded = connection.execute(
+                select(func.count()).select_from(models.Book.__table__)
+            ).scalar()
+        if unsharded:
+            raise RuntimeError(
+                f"BOOKS_DB_SHARDS={SHARD_COUNT} but {DATABASE_PATH} still "
+                f"holds {unsharded} books; migrate them to the shard files "
+                f"first")
+
+    with SessionLocal() as session:
+        layout = session.get(models.ShardLayout, 1)
+        if layout is None:
+            session.add(models.ShardLayout(id=1, shard_count=SHARD_COUNT))
+            session.commit()
+        elif layout.shard_count != SHARD_COUNT:
+            raise RuntimeError(
+                f"Database was created with {layout.shard_count} shard(s) "
+                f"but BOOKS_DB_SHARDS={SHARD_COUNT}; migrate the books "
+                f"before changing the shard count")
+
+
 def create_tables():
     """
     Create all database tables defined in models.
@@ -55,9 +159,11 @@ def create_tables():
         # Import models here to avoid circular imports
         from app import models
 
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
-        print(f"Database tables created: {DATABASE_PATH}")
+        # Jobs live in books.db, books on every shard
+        # (with one shard that is books.db as well)
+        Base.metadata.create_all(bind=engine, tables=[models.Job.__table__])
+        shards.create_all(Base.metadata, tables=[models.Book.__table__])
+        print(f"Database tables created: {', '.join(SHARD_PATHS)}")
 
         return True
     except Exception as e:
@@ -0,0 +1,135 @@
+"""
+Horizontal partitioning of the books table across SQLite files.
+
+Book ids are striped over the shards: shard k holds ids k + 1,
+k + 1 + N, k + 1 + 2N, ... so the shard of a book is (id - 1) % N and
+ids stay globally unique. New books go to the shards round-robin, which
+spreads writes (and the SQLite write lock) over all files.
+
+With a single shard nothing changes: SQLite assigns the ids itself.
+"""
+
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import MetaData, Table, column, func, select, table
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+T = TypeVar("T")
+
+
+class ShardRouter:
+    """
+    Engines, id allocation and parallel fan-out for N shard files.
+
+    Ids are allocated in memory, so only one process may write to a
+    sharded database at a time. Fan-out queries of all requests share
+    workers_per_shard * N threads.
+    """
+
+    def __init__(self, engines: List[Engine], table_name: str = "books",
+                 workers_per_shard: int = 8):
+        self.engines = engines
+        self.table_name = table_name
+        self.session_factories = [
+            sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            for engine in engines
+        ]
+        self._lock = threading.Lock()
+        self._next_ids: List[Optional[int]] = [None] * len(engines)
+        self._round_robin = itertools.count()
+        self._executor = (
+            ThreadPoolExecutor(max_workers=workers_per_shard * len(engines),
+                               thread_name_prefix="shard")
+            if len(engines) > 1 else None
+        )
+
+    @property
+    def count(self) -> int:
+        """Number of shards."""
+        return len(self.engines)
+
+    def shard_for(self, book_id: int) -> int:
+        """Return the shard holding a book id."""
+        return (book_id - 1) % self.count
+
+    def allocate(self) -> Tuple[int, Optional[int]]:
+        """
+        Pick the shard for a new book and reserve its id.
+
+        Returns (shard, id); id is None with a single shard, where SQLite
+        assigns it as before.
+        """
+        if self.count == 1:
+            return 0, None
+
+        with self._lock:
+            shard = next(self._round_robin) % self.count
+            if self._next_ids[shard] is None:
+                with self.engines[shard].connect() as connection:
+                    max_id = connection.execute(
+                        select(func.max(column("id")))
+                        .select_from(table(self.table_name))).scalar()
+                self._next_ids[shard] = (max_id + self.count if max_id
+                                         else shard + 1)
+            book_id = self._next_ids[shard]
+            self._next_ids[shard] += self.count
+
+        return shard, book_id
+
+    def create_all(self, metadata: MetaData,
+                   tables: Optional[List[Table]] = None) -> None:
+        """Create the tables (default: all of metadata) on every shard."""
+        for engine in self.engines:
+            metadata.create_all(bind=engine, tables=tables)
+
+    def map(self, fn: Callable[[int], T]) -> List[T]:
+        """Run fn(shard) for every shard in parallel, in shard order."""
+        if self._executor is None:
+            return [fn(0)]
+
+        return list(self._executor.map(fn, range(self.count)))
+
+
+class ShardSession:
+    """
+    Database sessions of one request, opened lazily per shard.
+    """
+
+    def __init__(self, router: ShardRouter):
+        self.router = router
+        self._sessions: Dict[int, Session] = {}
+
+    def session(self, shard: int) -> Session:
+        """Return the request's session on a shard."""
+        if shard not in self._sessions:
+            self._sessions[shard] = self.router.session_factories[shard]()
+
+        return self._sessions[shard]
+
+    def for_id(self, book_id: int) -> Session:
+        """Return the session on the shard holding a book id."""
+        return self.session(self.router.shard_for(book_id))
+
+    def for_new(self) -> Tuple[Session, Optional[int]]:
+        """Return the session and reserved id for a new book."""
+        shard, book_id = self.router.allocate()
+        return self.session(shard), book_id
+
+    def fan_out(self, fn: Callable[[Session], T]) -> List[T]:
+        """
+        Run fn on every shard's session in parallel.
+
+        Each session is only used by one thread at a time.
+        """
+        sessions = [self.session(shard) for shard in range(self.router.count)]
+        return self.router.map(lambda shard: fn(sessions[shard]))
+
+    def close(self) -> None:
+        """Close every session opened by the request."""
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
@@ -0,0 +1,64 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+
+from app import runAPI  # noqa: E402
+from app.suggest import PrefixIndex  # noqa: E402
+from database.engine import Base, enable_wal, get_shards  # noqa: E402
+from database.sharding import ShardRouter, ShardSession  # noqa: E402
+
+
+@pytest.fixture
+def make_router(tmp_path):
+    """
+    Return a factory for a ShardRouter over fresh shard files in tmp_path.
+    """
+    engines = []
+
+    def make(shard_count: int = 1) -> ShardRouter:
+        for _ in range(shard_count):
+            engine = create_engine(
+                f"sqlite:///{tmp_path / f'books_{len(engines)}.db'}",
+                connect_args={"check_same_thread": False, "timeout": 30})
+            enable_wal(engine)
+            engines.append(engine)
+        router = ShardRouter(engines[-shard_count:])
+        router.create_all(Base.metadata)
+        return router
+
+    yield make
+
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def make_client(make_router, monkeypatch):
+    """
+    Return a factory for a client of the app on fresh shard files, with an
+    empty autocomplete index.
+    """
+    def make(shard_count: int = 1) -> TestClient:
+        router = make_router(shard_count)
+
+        def get_test_shards():
+            db = ShardSession(router)
+            try:
+                yield db
+            finally:
+                db.close()
+
+        monkeypatch.setattr(runAPI, "suggest_index", PrefixIndex())
+        runAPI.app.dependency_overrides[get_shards] = get_test_shards
+        return TestClient(runAPI.app)
+
+    yield make
+
+    runAPI.app.dependency_overrides.clear()
@@ -0,0 +1,49 @@
+"""
+Tests for the book write endpoints keeping the autocomplete index in sync.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import runAPI
+
+WRITERS = 8
+UPDATES_PER_WRITER = 25
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client()
+
+
+def test_concurrent_renames_leave_only_the_final_title(client):
+    book = client.post("/books/", json={"title": "Animal Farm",
+                                        "author": "George Orwell"}).json()
+
+    def rename(writer: int) -> None:
+        for i in range(UPDATES_PER_WRITER):
+            response = client.put(f"/books/{book['id']}",
+                                  json={"title": f"Animal Farm {writer}-{i}"})
+            assert response.status_code == 200
+
+    with ThreadPoolExecutor(max_workers=WRITERS) as executor:
+        list(executor.map(rename, range(WRITERS)))
+
+    final = client.get(f"/books/{book['id']}").json()["title"]
+    assert runAPI.suggest_index.suggest("title", "animal farm", 500) == [final]
+    assert runAPI.suggest_index.suggest("author", "george", 10) == [
+        "George Orwell"]
+
+
+def test_rename_then_delete_empties_the_index(client):
+    book = client.post("/books/", json={"title": "Emma",
+                                        "author": "Jane Austen"}).json()
+
+    client.put(f"/books/{book['id']}", json={"title": "Persuasion"})
+    assert runAPI.suggest_index.suggest("title", "e", 10) == []
+    assert runAPI.suggest_index.suggest("title", "p", 10) == ["Persuasion"]
+
+    assert client.delete(f"/books/{book['id']}").status_code == 204
+    assert runAPI.suggest_index.suggest("title", "p", 10) == []
+    assert runAPI.suggest_index.suggest("author", "j", 10) == []
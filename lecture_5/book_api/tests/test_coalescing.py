@@ -0,0 +1,159 @@
+"""
+Tests for SingleFlight request coalescing.
+"""
+
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from app.coalescing import SingleFlight, copy_error
+
+CALLERS = 8
+
+
+def run_concurrently(flight: SingleFlight, fn, callers: int = CALLERS):
+    """
+    Call flight.do("key", fn) from several threads while fn is blocked,
+    and return the futures once every caller has joined the flight.
+    """
+    executor = ThreadPoolExecutor(max_workers=callers)
+    futures = [executor.submit(flight.do, "key", fn) for _ in range(callers)]
+    while flight.executions + flight.coalesced < callers:
+        time.sleep(0.001)
+    executor.shutdown(wait=False)
+    return futures
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def query():
+        calls.append(1)
+        release.wait()
+        return ["book"]
+
+    futures = run_concurrently(flight, query)
+    release.set()
+
+    results = [future.result(timeout=5) for future in futures]
+    assert results == [["book"]] * CALLERS
+    assert len(calls) == 1
+    assert flight.executions == 1
+    assert flight.coalesced == CALLERS - 1
+
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+    error = RuntimeError("database is locked")
+
+    def query():
+        release.wait()
+        raise error
+
+    futures = run_concurrently(flight, query)
+    release.set()
+
+    raised = []
+    for future in futures:
+        with pytest.raises(RuntimeError, match="database is locked") as info:
+            future.result(timeout=5)
+        raised.append(info.value)
+    assert flight.executions == 1
+
+    # The leader raises its own exception, every waiter a fresh copy, so
+    # no thread adds its frames to another thread's traceback
+    assert sum(1 for value in raised if value is error) == 1
+    assert len({id(value) for value in raised}) == CALLERS
+    frames = traceback.extract_tb(error.__traceback__)
+    assert [frame.name for frame in frames].count("do") == 1
+
+
+def test_waiters_get_copies_of_http_errors():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def query():
+        release.wait()
+        raise HTTPException(status_code=404, detail="Book not found",
+                            headers={"X-Test": "1"})
+
+    futures = run_concurrently(flight, query, callers=3)
+    release.set()
+
+    for future in futures:
+        with pytest.raises(HTTPException) as info:
+            future.result(timeout=5)
+        assert info.value.status_code == 404
+        assert info.value.detail == "Book not found"
+        assert info.value.headers == {"X-Test": "1"}
+
+
+def test_copy_error_keeps_fields_but_not_traceback():
+    try:
+        raise KeyError("title")
+    except KeyError as error:
+        original = error
+
+    clone = copy_error(original)
+    assert type(clone) is KeyError
+    assert clone.args == ("title",)
+    assert clone is not original
+    assert clone.__traceback__ is None
+    assert original.__traceback__ is not None
+
+
+def test_forget_all_makes_later_callers_run_their_own_query():
+    flight = SingleFlight()
+    release = threading.Event()
+    started = threading.Event()
+
+    def stale_query():
+        started.set()
+        release.wait()
+        return "before write"
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        in_flight = executor.submit(flight.do, "key", stale_query)
+        started.wait(timeout=5)
+
+        flight.forget_all()
+        assert flight.do("key", lambda: "after write") == "after write"
+
+        release.set()
+        assert in_flight.result(timeout=5) == "before write"
+
+    assert flight.executions == 2
+    assert flight.coalesced == 0
+
+
+def test_finished_call_is_not_reused():
+    flight = SingleFlight()
+
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    assert flight.executions == 2
+
+
+def test_disabled_runs_every_call():
+    flight = SingleFlight(enabled=False)
+    release = threading.Event()
+    calls = []
+
+    def query():
+        calls.append(1)
+        release.wait()
+        return "book"
+
+    futures = run_concurrently(flight, query, callers=4)
+    release.set()
+
+    assert [future.result(timeout=5) for future in futures] == ["book"] * 4
+    assert len(calls) == 4
+    assert flight.coalesced == 0
@@ -0,0 +1,288 @@
+"""
+Tests for the background job runner and the dedup job.
+"""
+
+import threading
+import time
+
+import pytest
+
+from app import catalog_jobs, models
+from app.coalescing import SingleFlight
+from app.jobs import JobCancelled, JobQueueFull, JobRunner
+from app.locks import StripedLock
+from app.suggest import PrefixIndex
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+def wait_for(runner: JobRunner, job_id: int, statuses=FINISHED,
+             timeout: float = 5.0) -> models.Job:
+    """Poll a job until it reaches one of statuses."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = runner.get(job_id)
+        if job.status in statuses:
+            return job
+        assert time.monotonic() < deadline, f"job stuck in {job.status}"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def gate():
+    """Event released at the end of the test, so blocked jobs can finish."""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+@pytest.fixture
+def make_runner(make_router, gate):
+    """Return a factory for a started JobRunner on a temporary database."""
+    runners = []
+
+    def blocked(context):
+        while not gate.wait(0.005):
+            context.check_cancelled()
+        return {"done": True}
+
+    def make(handlers=None, **options) -> JobRunner:
+        router = make_router()
+        runner = JobRunner(router.session_factories[0],
+                           {"blocked": blocked, **(handlers or {})},
+                           **options)
+        runner.start()
+        runners.append(runner)
+        return runner
+
+    yield make
+
+    gate.set()
+    for runner in runners:
+        runner.shutdown()
+
+
+def test_job_succeeds_with_its_result(make_runner, gate):
+    runner = make_runner()
+    job = runner.submit("blocked", {})
+    wait_for(runner, job.id, ("running",))
+
+    gate.set()
+    job = wait_for(runner, job.id)
+    assert job.status == "succeeded"
+    assert job.result == '{"done": true}'
+    assert job.started_at is not None and job.finished_at is not None
+
+
+def test_cancelled_queued_job_never_starts(make_runner):
+    calls = []
+    runner = make_runner({"record": lambda context: calls.append(1)},
+                         max_workers=1)
+    blocker = runner.submit("blocked", {})
+    wait_for(runner, blocker.id, ("running",))
+    queued = runner.submit("record", {})
+
+    # Marked cancelled at once, not when a worker picks it up
+    job = runner.cancel(queued.id)
+    assert job.status == "cancelled"
+    assert job.cancel_requested
+
+    runner.cancel(blocker.id)
+    assert wait_for(runner, blocker.id).status == "cancelled"
+    runner.shutdown()
+    assert calls == []
+    assert runner.get(queued.id).started_at is None
+
+
+def test_worker_does_not_start_job_cancelled_in_database(make_runner, gate):
+    calls = []
+    runner = make_runner({"record": lambda context: calls.append(1)},
+                         max_workers=1)
+    blocker = runner.submit("blocked", {})
+    wait_for(runner, blocker.id, ("running",))
+    queued = runner.submit("record", {})
+
+    # cancel() has marked the row but the worker has not seen the event
+    runner._update(queued.id, status="cancelled")
+    gate.set()
+    wait_for(runner, blocker.id)
+    runner.shutdown()
+
+    assert calls == []
+    assert runner.get(queued.id).status == "cancelled"
+
+
+def test_cancel_stops_running_job_at_next_chunk(make_runner):
+    runner = make_runner()
+    job = runner.submit("blocked", {})
+    wait_for(runner, job.id, ("running",))
+
+    runner.cancel(job.id)
+    assert wait_for(runner, job.id).status == "cancelled"
+
+
+def test_handler_error_fails_job(make_runner):
+    def broken(context):
+        raise ValueError("bad data")
+
+    runner = make_runner({"broken": broken})
+    job = wait_for(runner, runner.submit("broken", {}).id)
+    assert job.status == "failed"
+    assert job.error == "bad data"
+
+
+def test_error_outside_handler_fails_job(make_runner):
+    runner = make_runner({"noop": lambda context: None}, max_workers=1)
+    blocker = runner.submit("blocked", {})
+    wait_for(runner, blocker.id, ("running",))
+    job = runner.submit("noop", {})
+    runner._update(job.id, params="{not json")
+
+    runner.cancel(blocker.id)
+    job = wait_for(runner, job.id)
+    assert job.status == "failed"
+    assert job.error
+
+
+def test_queue_full(make_runner):
+    runner = make_runner(max_workers=1, max_pending=2)
+    runner.submit("blocked", {})
+    runner.submit("blocked", {})
+
+    with pytest.raises(JobQueueFull):
+        runner.submit("blocked", {})
+
+
+def test_start_fails_jobs_left_by_previous_process(make_router):
+    router = make_router()
+    with router.session_factories[0]() as session:
+        session.add(models.Job(kind="stats", status="running"))
+        session.commit()
+
+    runner = JobRunner(router.session_factories[0], {})
+    runner.start()
+    try:
+        job = runner.get(1)
+        assert job.status == "failed"
+        assert job.error == "Interrupted by a server restart"
+    finally:
+        runner.shutdown()
+
+
+class StubContext:
+    """JobContext stand-in running a callback once the scan is done."""
+
+    def __init__(self, params, after_scan=None):
+        self.job_id = 1
+        self.params = params
+        self.after_scan = after_scan
+        self.total = None
+        self.processed = 0
+
+    def set_total(self, total):
+        self.total = total
+
+    def advance(self, count):
+        self.processed += count
+        if self.processed == self.total and self.after_scan:
+            self.after_scan()
+            self.after_scan = None
+
+    def check_cancelled(self):
+        pass
+
+
+@pytest.fixture
+def catalog(make_router, tmp_path):
+    """Two shards of books with duplicates, and the dedup handler."""
+    router = make_router(2)
+    books = [(1, "Dune", "Herbert"), (2, "dune", "HERBERT"),
+             (3, "Emma", "Austen"), (4, "EMMA", "austen"),
+             (5, "Ulysses", "Joyce"), (6, "ulysses", "joyce"),
+             (7, "Dune", "herbert"), (8, "Ulysses", "Joyce 2")]
+    for book_id, title, author in books:
+        with router.session_factories[router.shard_for(book_id)]() as session:
+            session.add(models.Book(id=book_id, title=title, author=author))
+            session.commit()
+
+    index = PrefixIndex()
+    index.build((title, author) for _, title, author in books)
+    handlers = catalog_jobs.build_handlers(router, index, StripedLock(),
+                                           SingleFlight(), str(tmp_path))
+    return router, index, handlers["dedup"]
+
+
+def remaining_ids(router):
+    ids = []
+    for factory in router.session_factories:
+        with factory() as session:
+            ids.extend(book_id for book_id, in session.query(models.Book.id))
+    return sorted(ids)
+
+
+def test_dedup_dry_run_reports_duplicates(catalog):
+    router, _, dedup = catalog
+
+    result = dedup(StubContext({}))
+    assert result["dry_run"] is True
+    assert result["duplicates"] == 4
+    assert result["sample_ids"] == [2, 4, 6, 7]
+    with open(result["ids_path"]) as file:
+        assert file.read().split() == ["2", "4", "6", "7"]
+    assert remaining_ids(router) == list(range(1, 9))
+
+
+def test_dedup_result_holds_only_a_sample(catalog, monkeypatch):
+    monkeypatch.setattr(catalog_jobs, "SAMPLE_SIZE", 2)
+    _, _, dedup = catalog
+
+    result = dedup(StubContext({}))
+    assert result["duplicates"] == 4
+    assert result["sample_ids"] == [2, 4]
+
+
+def test_dedup_deletes_duplicates(catalog):
+    router, index, dedup = catalog
+
+    result = dedup(StubContext({"dry_run": False}))
+    assert result["deleted"] == 4
+    assert remaining_ids(router) == [1, 3, 5, 8]
+    assert index.suggest("title", "", 10) == ["Dune", "Emma", "Ulysses"]
+
+
+def test_dedup_skips_books_changed_after_scan(catalog):
+    router, index, dedup = catalog
+
+    def edit():
+        # Book 4 is renamed, the book kept instead of 6 is deleted
+        with router.session_factories[router.shard_for(4)]() as session:
+            session.get(models.Book, 4).title = "Emma 2"
+            session.commit()
+        with router.session_factories[router.shard_for(5)]() as session:
+            session.delete(session.get(models.Book, 5))
+            session.commit()
+        index.replace(("EMMA", "austen"), ("Emma 2", "austen"))
+        index.remove("Ulysses", "Joyce")
+
+    result = dedup(StubContext({"dry_run": False}, after_scan=edit))
+    assert result["deleted"] == 2
+    assert remaining_ids(router) == [1, 3, 4, 6, 8]
+    assert "Emma 2" in index.suggest("title", "emma", 10)
+
+
+def test_dedup_cancelled_between_chunks(catalog, monkeypatch):
+    monkeypatch.setattr(catalog_jobs, "CHUNK_SIZE", 1)
+    router, _, dedup = catalog
+    context = StubContext({"dry_run": False})
+    deletes = []
+
+    def check_cancelled():
+        deletes.append(1)
+        if len(deletes) == 2:
+            raise JobCancelled()
+
+    context.check_cancelled = check_cancelled
+
+    with pytest.raises(JobCancelled):
+        dedup(context)
+    assert len(remaining_ids(router)) == 6
@@ -0,0 +1,157 @@
+"""
+Tests for shard routing and paging over the sharded books table.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from app import models, runAPI
+from database.sharding import ShardSession
+
+BOOKS = 23
+
+
+def test_shard_for_stripes_ids(make_router):
+    router = make_router(3)
+    assert [router.shard_for(book_id) for book_id in range(1, 8)] == [
+        0, 1, 2, 0, 1, 2, 0]
+
+
+def test_single_shard_leaves_ids_to_sqlite(make_router):
+    router = make_router(1)
+    assert router.allocate() == (0, None)
+    assert router.shard_for(42) == 0
+
+
+def test_allocate_round_robin_with_striped_ids(make_router):
+    router = make_router(3)
+    allocated = [router.allocate() for _ in range(7)]
+    assert allocated == [(0, 1), (1, 2), (2, 3), (0, 4), (1, 5), (2, 6),
+                         (0, 7)]
+    assert all(router.shard_for(book_id) == shard
+               for shard, book_id in allocated)
+
+
+def test_allocate_continues_after_existing_books(make_router):
+    router = make_router(2)
+    with router.session_factories[1]() as session:
+        session.add(models.Book(id=10, title="T", author="A"))
+        session.commit()
+
+    # A new router (as after a restart) reads each shard's highest id
+    restarted = type(router)(router.engines)
+    assert restarted.allocate() == (0, 1)
+    assert restarted.allocate() == (1, 12)
+
+
+def test_concurrent_allocations_are_unique(make_router):
+    router = make_router(4)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        allocated = list(executor.map(lambda _: router.allocate(),
+                                      range(400)))
+
+    ids = [book_id for _, book_id in allocated]
+    assert sorted(ids) == list(range(1, 401))
+    assert all(router.shard_for(book_id) == shard
+               for shard, book_id in allocated)
+
+
+def test_map_keeps_shard_order(make_router):
+    router = make_router(4)
+    assert router.map(lambda shard: shard * 10) == [0, 10, 20, 30]
+
+
+def test_shard_session_routes_and_fans_out(make_router):
+    router = make_router(3)
+    db = ShardSession(router)
+    try:
+        for _ in range(6):
+            session, book_id = db.for_new()
+            session.add(models.Book(id=book_id, title=f"Book {book_id}",
+                                    author="A"))
+            session.commit()
+
+        assert db.for_id(5).get(models.Book, 5).title == "Book 5"
+        assert db.for_id(5) is db.session(1)
+        assert db.fan_out(lambda session: sorted(
+            book_id for book_id, in session.query(models.Book.id))) == [
+            [1, 4], [2, 5], [3, 6]]
+    finally:
+        db.close()
+
+
+def test_merge_by_id_interleaves_shards():
+    shards = [[SimpleNamespace(id=i) for i in ids]
+              for ids in ([1, 4, 10], [2, 5], [], [3, 12])]
+    assert [book.id for book in runAPI.merge_by_id(shards)] == [
+        1, 2, 3, 4, 5, 10, 12]
+
+
+@pytest.fixture(params=[1, 3], ids=["single", "sharded"])
+def client(request, make_client):
+    client = make_client(request.param)
+    for i in range(BOOKS):
+        response = client.post("/books/", json={"title": f"Book {i}",
+                                                "author": f"Author {i}"})
+        assert response.status_code == 201
+    return client
+
+
+def all_ids(client):
+    return [book["id"] for book in client.get("/books/?limit=500").json()]
+
+
+def test_list_is_ordered_by_id(client):
+    ids = all_ids(client)
+    assert len(ids) == BOOKS
+    assert ids == sorted(ids)
+
+
+@pytest.mark.parametrize("skip, limit", [(0, 5), (4, 7), (20, 10), (30, 5)])
+def test_pages_by_offset(client, skip, limit):
+    ids = all_ids(client)
+    page = client.get(f"/books/?skip={skip}&limit={limit}").json()
+    assert [book["id"] for book in page] == ids[skip:skip + limit]
+    assert all(book["title"].startswith("Book ") for book in page)
+
+
+def test_pages_by_after_id(client):
+    ids = all_ids(client)
+    seen = []
+    after_id = 0
+    while True:
+        page = client.get(f"/books/?after_id={after_id}&limit=4").json()
+        if not page:
+            break
+        seen.extend(book["id"] for book in page)
+        after_id = page[-1]["id"]
+    assert seen == ids
+
+
+def test_after_id_combines_with_skip(client):
+    ids = all_ids(client)
+    page = client.get(f"/books/?after_id={ids[5]}&skip=2&limit=3").json()
+    assert [book["id"] for book in page] == ids[8:11]
+
+
+def test_deep_offset_is_refused_when_sharded(make_client):
+    client = make_client(3)
+    response = client.get(f"/books/?skip={runAPI.MAX_SHARDED_SKIP + 1}")
+    assert response.status_code == 400
+
+
+def test_deep_offset_is_served_from_a_single_file(make_client):
+    client = make_client(1)
+    response = client.get(f"/books/?skip={runAPI.MAX_SHARDED_SKIP + 1}")
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_search_merges_shards_by_id(client):
+    ids = all_ids(client)
+    found = client.get("/books/search/?title=book 1").json()
+    expected = [book_id for book_id, i in zip(ids, range(BOOKS))
+                if str(i).startswith("1")]
+    assert [book["id"] for book in found] == expected
@@ -0,0 +1,149 @@
+"""
+Tests for the autocomplete PrefixIndex.
+"""
+
+import gzip
+import json
+
+import pytest
+
+from app.suggest import SNAPSHOT_VERSION, PrefixIndex
+
+FINGERPRINT = (2, 2)
+BOOKS = [("Dune", "Frank Herbert"), ("Emma", "Jane Austen")]
+
+
+def write_snapshot(path, **sections):
+    """Write a snapshot with the current version and FINGERPRINT."""
+    snapshot = {"version": SNAPSHOT_VERSION,
+                "fingerprint": list(FINGERPRINT), **sections}
+    with gzip.open(path, "wb") as file:
+        file.write(json.dumps(snapshot).encode("utf-8"))
+
+
+@pytest.fixture
+def index():
+    index = PrefixIndex()
+    index.build(BOOKS)
+    return index
+
+
+def test_prefix_lookup_ignores_case(index):
+    assert index.suggest("title", "du", 10) == ["Dune"]
+    assert index.suggest("title", "DU", 10) == ["Dune"]
+    assert index.suggest("author", "jane a", 10) == ["Jane Austen"]
+    assert index.suggest("title", "x", 10) == []
+
+
+def test_casefold_matches_non_ascii():
+    index = PrefixIndex()
+    index.build([("Straße", "Ödön von Horváth"), ("Stra", "A")])
+
+    assert index.suggest("title", "STRASS", 10) == ["Straße"]
+    assert index.suggest("author", "öd", 10) == ["Ödön von Horváth"]
+
+
+def test_results_are_alphabetical_and_limited():
+    index = PrefixIndex()
+    index.build([(title, "A") for title in ("Cc", "ab", "Ba", "aa", "Ac")])
+
+    assert index.suggest("title", "", 10) == ["aa", "ab", "Ac", "Ba", "Cc"]
+    assert index.suggest("title", "a", 2) == ["aa", "ab"]
+
+
+def test_separator_in_prefix_is_ignored(index):
+    assert index.suggest("title", "d\0", 10) == ["Dune"]
+
+
+def test_duplicate_spellings_are_counted():
+    index = PrefixIndex()
+    index.build([("Dune", "Herbert"), ("Dune", "Herbert"), ("DUNE", "x")])
+
+    # Each spelling is suggested once
+    assert index.suggest("title", "dune", 10) == ["DUNE", "Dune"]
+    assert index.stats()["title"]["entries"] == 2
+
+    # The spelling stays until its last book is gone
+    index.remove("Dune", "Herbert")
+    assert index.suggest("title", "dune", 10) == ["DUNE", "Dune"]
+    index.remove("Dune", "Herbert")
+    assert index.suggest("title", "dune", 10) == ["DUNE"]
+    assert index.suggest("author", "h", 10) == []
+
+
+def test_add_remove_and_replace(index):
+    index.add("Dune Messiah", "Frank Herbert")
+    assert index.suggest("title", "dune", 10) == ["Dune", "Dune Messiah"]
+
+    index.replace(("Dune Messiah", "Frank Herbert"),
+                  ("Children of Dune", "Frank Herbert"))
+    assert index.suggest("title", "dune", 10) == ["Dune"]
+    assert index.suggest("title", "c", 10) == ["Children of Dune"]
+    assert index.suggest("author", "frank", 10) == ["Frank Herbert"]
+
+    # Removing something that is not indexed is ignored
+    index.remove("Missing", "Nobody")
+    assert index.stats()["title"]["entries"] == 3
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = PrefixIndex()
+    index.build(BOOKS + [("Dune", "Frank Herbert")])
+    path = str(tmp_path / "snapshot.json.gz")
+    index.save(path, FINGERPRINT)
+
+    loaded = PrefixIndex()
+    assert loaded.load(path, FINGERPRINT) is True
+    assert loaded.suggest("title", "", 10) == ["Dune", "Emma"]
+    assert loaded.suggest("author", "", 10) == ["Frank Herbert",
+                                                "Jane Austen"]
+
+    # Counts survive: one of the two "Dune" books leaves the entry
+    loaded.remove("Dune", "Frank Herbert")
+    assert loaded.suggest("title", "d", 10) == ["Dune"]
+
+
+def test_snapshot_of_other_fingerprint_or_version_is_not_loaded(tmp_path,
+                                                                index):
+    path = str(tmp_path / "snapshot.json.gz")
+    index.save(path, FINGERPRINT)
+
+    assert PrefixIndex().load(path, (3, 3)) is False
+
+    with gzip.open(path, "rb") as file:
+        snapshot = json.loads(file.read())
+    snapshot["version"] = SNAPSHOT_VERSION + 1
+    with gzip.open(path, "wb") as file:
+        file.write(json.dumps(snapshot).encode("utf-8"))
+    assert PrefixIndex().load(path, FINGERPRINT) is False
+
+
+@pytest.mark.parametrize("sections", [
+    {},
+    {"title": {"entries": [], "counts": []}},
+    {"title": None, "author": None},
+    {"title": [], "author": []},
+    {"title": {"entries": 1, "counts": 1},
+     "author": {"entries": [], "counts": []}},
+    {"title": {"entries": ["a\0a"], "counts": []},
+     "author": {"entries": [], "counts": []}},
+    {"title": {"entries": [["a"]], "counts": [1]},
+     "author": {"entries": [], "counts": []}},
+    {"title": {"entries": [1], "counts": [1]},
+     "author": {"entries": [], "counts": []}},
+], ids=["missing", "missing author", "null", "lists", "not lists",
+        "length mismatch", "unhashable", "not strings"])
+def test_damaged_snapshot_is_not_loaded(tmp_path, index, sections):
+    path = tmp_path / "snapshot.json.gz"
+    write_snapshot(path, **sections)
+
+    assert index.load(str(path), FINGERPRINT) is False
+    assert index.suggest("title", "d", 10) == ["Dune"]
+
+
+def test_unreadable_snapshot_is_not_loaded(tmp_path, index):
+    path = tmp_path / "snapshot.json.gz"
+    path.write_bytes(b"not gzip")
+
+    assert index.load(str(path), FINGERPRINT) is False
+    assert index.load(str(tmp_path / "missing.json.gz"), FINGERPRINT) is False
@@ -1,7 +1,13 @@
 from fastapi import FastAPI
 
+from admission import AdmissionControlMiddleware
+
 app = FastAPI()
 
+# The health check is in the priority lane, so it answers even under overload
+app.add_middleware(AdmissionControlMiddleware,
+                   priority_paths=("/healthcheck",))
+
 
 @app.get("/healthcheck")
 async def healthcheck() -> dict: